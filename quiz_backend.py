@@ -1,35 +1,697 @@
 import toml
+import hashlib
+import json
+import mmap
+import os
 import random
+import re
+import struct
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from collections.abc import Mapping
+import quiz_metrics as metrics
+from quiz_storage import QueuedJournal, SqliteQuestionJournal, UserJournal, get_storage, is_sqlite
 
-def load_questions(filename):
-    with open(filename, 'r') as file:
-        data = toml.load(file)
-    return data['question']
+CACHE_SUFFIX = '.cache'
 
+# Question cache layout: header, one fixed-size entry per question (body
+# offset, body length, category code, difficulty code), the JSON-encoded
+# question bodies, then a JSON list of the normalized category/difficulty
+# strings the codes refer to.
+CACHE_MAGIC = b'QBC1'
+CACHE_HEADER = struct.Struct('<4sqq32sIQ')
+CACHE_ENTRY = struct.Struct('<QIHH')
+
+@metrics.instrument('load_questions')
+def load_questions(filename, cached=False, compact=False):
+    if cached and not is_sqlite(filename):
+        return load_cached_questions(filename, compact)
+    questions = get_storage(filename).load_questions()
+    return compact_questions(questions) if compact else questions
+
+@metrics.instrument('save_questions')
 def save_questions(filename, questions):
-    with open(filename, 'w') as file:
-        toml.dump({'question': questions}, file)
+    get_storage(filename).save_questions(questions)
+
+@metrics.instrument('load_cached_questions')
+def load_cached_questions(filename, compact=False):
+    cache_filename = filename + CACHE_SUFFIX
+    stat = os.stat(filename)
+    header = _read_cache_header(cache_filename)
+    if header is not None:
+        _, mtime_ns, size, digest, _, _ = header
+        if (mtime_ns, size) == (stat.st_mtime_ns, stat.st_size):
+            return LazyQuestions(cache_filename, compact)
+        with open(filename, 'rb') as file:
+            source = file.read()
+        if hashlib.sha256(source).digest() == digest:
+            # Touched but unchanged: refresh the recorded mtime and keep the cache.
+            with open(cache_filename, 'r+b') as file:
+                file.write(CACHE_HEADER.pack(CACHE_MAGIC, stat.st_mtime_ns, stat.st_size, digest, header[4], header[5]))
+            return LazyQuestions(cache_filename, compact)
+    questions = build_question_cache(filename)
+    return compact_questions(questions) if compact else questions
+
+@metrics.instrument('build_question_cache')
+def build_question_cache(filename):
+    with open(filename, 'rb') as file:
+        source = file.read()
+    metrics.add_bytes('build_question_cache', read=len(source))
+    stat = os.stat(filename)
+    questions = toml.loads(source.decode('utf-8'))['question']
+
+    strings = {}
+    def code(value):
+        return strings.setdefault(normalize_key(value), len(strings))
+
+    entries = []
+    bodies = []
+    offset = CACHE_HEADER.size + CACHE_ENTRY.size * len(questions)
+    for question in questions:
+        body = json.dumps(question).encode('utf-8')
+        entries.append(CACHE_ENTRY.pack(offset, len(body), code(question['category']), code(question['difficulty'])))
+        bodies.append(body)
+        offset += len(body)
+
+    cache_filename = filename + CACHE_SUFFIX
+    temp_filename = cache_filename + '.tmp'
+    with open(temp_filename, 'wb') as file:
+        file.write(CACHE_HEADER.pack(CACHE_MAGIC, stat.st_mtime_ns, stat.st_size,
+                                     hashlib.sha256(source).digest(), len(questions), offset))
+        file.writelines(entries)
+        file.writelines(bodies)
+        file.write(json.dumps(list(strings)).encode('utf-8'))
+        metrics.add_bytes('build_question_cache', written=file.tell())
+    os.replace(temp_filename, cache_filename)
+    return questions
+
+def _read_cache_header(cache_filename):
+    try:
+        with open(cache_filename, 'rb') as file:
+            header = CACHE_HEADER.unpack(file.read(CACHE_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return header if header[0] == CACHE_MAGIC else None
 
+class LazyQuestions:
+    # Read-only view over a question cache; bodies are decoded on access,
+    # into Question records when compact is set.
+    def __init__(self, cache_filename, compact=False):
+        self._compact = compact
+        with open(cache_filename, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        _, _, _, _, self._count, strings_offset = CACHE_HEADER.unpack_from(self._map)
+        self._strings = json.loads(self._map[strings_offset:].decode('utf-8'))
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for index in range(self._count):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        offset, length, _, _ = self._entry(index)
+        question = json.loads(self._map[offset:offset + length].decode('utf-8'))
+        return Question.from_dict(question) if self._compact else question
+
+    def category_difficulty(self, index):
+        _, _, category, difficulty = self._entry(index)
+        return self._strings[category], self._strings[difficulty]
+
+    def close(self):
+        self._map.close()
+
+    def _entry(self, index):
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('question index out of range')
+        return CACHE_ENTRY.unpack_from(self._map, CACHE_HEADER.size + CACHE_ENTRY.size * index)
+
+@metrics.instrument('load_users')
 def load_users(filename):
-    with open(filename, 'r') as file:
-        data = toml.load(file)
-    return data['user']
+    return get_storage(filename).load_users()
 
+@metrics.instrument('save_users')
 def save_users(filename, users):
-    with open(filename, 'w') as file:
-        toml.dump({'user': users}, file)
+    get_storage(filename).save_users(users)
+
+def normalize_key(value):
+    return value.strip().lower() if value is not None else None
+
+QUESTION_FIELDS = ('category', 'difficulty', 'text', 'options', 'answer', 'feedback')
+
+# Category and difficulty strings shared by every Question, which only
+# keeps their position in _field_names.
+_field_codes = {}
+_field_names = []
+
+def field_code(value):
+    code = _field_codes.get(value)
+    if code is None:
+        code = _field_codes[value] = len(_field_names)
+        _field_names.append(value)
+    return code
+
+class Question(Mapping):
+    # Read-only, compact stand-in for a question dict: category and
+    # difficulty are codes, options a tuple, and the answer is stored as
+    # the index of the correct option (or as its text when it is not one
+    # of the options). question['options'] still returns a list, and
+    # dict(question) gives back the original dict for saving.
+    __slots__ = ('category_code', 'difficulty_code', 'text', 'options', 'answer_index', 'feedback')
+
+    def __init__(self, category, difficulty, text, options, answer, feedback):
+        self.category_code = field_code(category)
+        self.difficulty_code = field_code(difficulty)
+        self.text = text
+        self.options = tuple(options)
+        try:
+            self.answer_index = self.options.index(answer)
+        except ValueError:
+            self.answer_index = answer
+        self.feedback = feedback
+
+    @classmethod
+    def from_dict(cls, question):
+        if isinstance(question, Question):
+            return question
+        return cls(question['category'], question['difficulty'], question['text'],
+                   question['options'], question['answer'], question['feedback'])
+
+    @property
+    def category(self):
+        return _field_names[self.category_code]
+
+    @property
+    def difficulty(self):
+        return _field_names[self.difficulty_code]
+
+    @property
+    def answer(self):
+        index = self.answer_index
+        return self.options[index] if isinstance(index, int) else index
+
+    def is_correct(self, choice):
+        # Compares option text, not indexes, to match ask_question on dicts
+        # when the answer text appears more than once among the options.
+        return self.options[choice - 1] == self.answer
+
+    def __getitem__(self, key):
+        if key == 'options':
+            return list(self.options)
+        if key in QUESTION_FIELDS:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(QUESTION_FIELDS)
+
+    def __len__(self):
+        return len(QUESTION_FIELDS)
+
+    def __repr__(self):
+        return f"Question({dict(self)!r})"
+
+    def __reduce__(self):
+        # Codes are only meaningful in this process, so pickle the strings.
+        return Question, (self.category, self.difficulty, self.text, self.options, self.answer, self.feedback)
+
+def compact_questions(questions):
+    return [Question.from_dict(question) for question in questions]
+
+WORD_PATTERN = re.compile(r'\w+')
+
+def search_terms(text):
+    return WORD_PATTERN.findall(text.lower())
+
+def question_terms(question):
+    terms = set(search_terms(question['text']))
+    for option in question['options']:
+        terms.update(search_terms(option))
+    terms.update(search_terms(question['feedback']))
+    return terms
+
+class SearchIndex:
+    # Inverted index from lower-cased words in the text, options and
+    # feedback to the ids of the questions containing them. _terms is kept
+    # sorted so the words sharing a prefix form one contiguous run.
+    def __init__(self, questions=()):
+        self._postings = {}
+        for question_id, question in questions:
+            for term in question_terms(question):
+                self._postings.setdefault(term, set()).add(question_id)
+        self._terms = sorted(self._postings)
+
+    def add(self, question_id, question):
+        for term in question_terms(question):
+            ids = self._postings.get(term)
+            if ids is None:
+                ids = self._postings[term] = set()
+                insort(self._terms, term)
+            ids.add(question_id)
+
+    def remove(self, question_id, question):
+        for term in question_terms(question):
+            ids = self._postings.get(term)
+            if ids is None:
+                continue
+            ids.discard(question_id)
+            if not ids:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def prefix_terms(self, prefix):
+        position = bisect_left(self._terms, prefix)
+        while position < len(self._terms) and self._terms[position].startswith(prefix):
+            yield self._terms[position]
+            position += 1
+
+    def search(self, query, prefix=True):
+        # Every word must match exactly, except that with prefix=True the
+        # last one matches as a prefix, for search-as-you-type. Returns the
+        # matching ids in ascending order.
+        words = search_terms(query)
+        if not words:
+            return []
+        last = words.pop() if prefix else None
+        postings = []
+        for word in words:
+            ids = self._postings.get(word)
+            if not ids:
+                return []
+            postings.append(ids)
+        # Intersect smallest first so each step is bounded by the rarest word.
+        postings.sort(key=len)
+        if not postings:
+            matches = None
+        elif len(postings) == 1:
+            matches = postings[0]
+        else:
+            matches = postings[0].intersection(*postings[1:])
+        if last is not None:
+            matched = set()
+            for term in self.prefix_terms(last):
+                matched |= self._postings[term] if matches is None else self._postings[term] & matches
+            matches = matched
+        return sorted(matches)
+
+class QuestionBank:
+    # Questions are kept under stable ids so the indexes survive deletes
+    # and edits; _order maps list positions to ids. A LazyQuestions source
+    # is decoded on access and only indexed once a filter needs it. A
+    # journal, when given, gets one record per insert, edit and delete.
+    def __init__(self, questions=(), journal=None):
+        self._items = {}
+        self._order = []
+        self._next_id = 0
+        self._by_category = {}
+        self._by_difficulty = {}
+        self._by_category_difficulty = {}
+        # Per-stratum id arrays with swap-remove slots, for O(1) random access
+        self._strata = {}
+        self._stratum_slots = {}
+        self._source = None
+        self._indexed = True
+        self._search = None
+        # Changes made while a search index is built elsewhere, replayed by
+        # install_search; None when no build is in progress.
+        self._search_backlog = None
+        self.journal = None
+        if isinstance(questions, LazyQuestions):
+            self._source = questions
+            self._order = list(range(len(questions)))
+            self._next_id = len(questions)
+            self._indexed = False
+        else:
+            for question in questions:
+                self.append(question)
+        # Attached after loading so the initial questions are not re-recorded.
+        self.journal = journal
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        for question_id in self._order:
+            yield self._get(question_id)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._get(question_id) for question_id in self._order[index]]
+        return self._get(self._order[index])
+
+    def __setitem__(self, index, question):
+        question_id = self._order[index]
+        previous = self._get(question_id)
+        self._items[question_id] = question
+        if self._keys(previous) != self._keys(question):
+            self._unindex(question_id, previous)
+            self._index(question_id, question)
+        self._search_remove(question_id, previous)
+        self._search_add(question_id, question)
+        if self.journal is not None:
+            self.journal.record_question_update(question_id, question)
+
+    def append(self, question):
+        question_id = self._next_id
+        self._next_id += 1
+        self._items[question_id] = question
+        self._order.append(question_id)
+        self._index(question_id, question)
+        self._search_add(question_id, question)
+        if self.journal is not None:
+            self.journal.record_question_insert(question_id, question)
+
+    def pop(self, index=-1):
+        question_id = self._order.pop(index)
+        question = self._get(question_id)
+        del self._items[question_id]
+        self._unindex(question_id, question)
+        self._search_remove(question_id, question)
+        if self.journal is not None:
+            self.journal.record_question_delete(question_id)
+        return question
+
+    def add_question(self, category, difficulty, text, options, answer, feedback):
+        return add_question(self, category, difficulty, text, options, answer, feedback)
+
+    def delete_question(self, index):
+        return delete_question(self, index)
+
+    def update_question(self, index, question):
+        self[index] = question
+        return self
+
+    def filter(self, category=None, difficulty=None):
+        category = normalize_key(category)
+        difficulty = normalize_key(difficulty)
+        if category is None and difficulty is None:
+            return list(self)
+        self._build_indexes()
+        if difficulty is None:
+            ids = self._by_category.get(category, ())
+        elif category is None:
+            ids = self._by_difficulty.get(difficulty, ())
+        else:
+            ids = self._by_category_difficulty.get((category, difficulty), ())
+        return [self._get(question_id) for question_id in ids]
+
+    def categories(self):
+        self._build_indexes()
+        return list(self._by_category)
+
+    def strata(self):
+        self._build_indexes()
+        return {key: len(ids) for key, ids in self._strata.items()}
+
+    def stratum_id(self, key, slot):
+        self._build_indexes()
+        return self._strata[key][slot]
+
+    def get_by_id(self, question_id):
+        return self._get(question_id)
+
+    def snapshot(self):
+        # Cheap enough for the UI thread: only the id order and the questions
+        # decoded so far are copied. The rest are decoded from the read-only
+        # source when the snapshot is iterated, e.g. on a writer thread.
+        return QuestionSnapshot(list(self._order), dict(self._items), self._source)
+
+    def position(self, question_id):
+        return self._order.index(question_id)
+
+    def search(self, query, prefix=True):
+        # Without a prepared index the first search builds one in place.
+        if self._search is None:
+            self._search_backlog = None
+            self._search = SearchIndex(self.snapshot().items())
+        return self._search.search(query, prefix)
+
+    def search_ready(self):
+        return self._search is not None
+
+    def search_builder(self):
+        # Returns a function that builds the search index from a snapshot
+        # and is safe to run on another thread. Pass its result to
+        # install_search on this bank's thread; edits made in between are
+        # queued and replayed there.
+        snapshot = self.snapshot()
+        self._search_backlog = []
+        return lambda: SearchIndex(snapshot.items())
+
+    def install_search(self, index):
+        # index is None when the build failed; search() then builds in place.
+        if self._search is not None or index is None:
+            # A search may already have built a current index meanwhile.
+            self._search_backlog = None
+            return
+        for added, question_id, question in self._search_backlog or ():
+            if added:
+                index.add(question_id, question)
+            else:
+                index.remove(question_id, question)
+        self._search_backlog = None
+        self._search = index
+
+    def _search_add(self, question_id, question):
+        if self._search is not None:
+            self._search.add(question_id, question)
+        elif self._search_backlog is not None:
+            self._search_backlog.append((True, question_id, question))
+
+    def _search_remove(self, question_id, question):
+        if self._search is not None:
+            self._search.remove(question_id, question)
+        elif self._search_backlog is not None:
+            self._search_backlog.append((False, question_id, question))
+
+    def difficulties(self):
+        self._build_indexes()
+        return list(self._by_difficulty)
+
+    def _get(self, question_id):
+        question = self._items.get(question_id)
+        if question is None:
+            question = self._source[question_id]
+            self._items[question_id] = question
+        return question
+
+    def _keys(self, question):
+        return normalize_key(question['category']), normalize_key(question['difficulty'])
+
+    def _build_indexes(self):
+        if self._indexed:
+            return
+        self._indexed = True
+        for question_id in self._order:
+            question = self._items.get(question_id)
+            if question is None:
+                self._add_to_indexes(question_id, *self._source.category_difficulty(question_id))
+            else:
+                self._index(question_id, question)
+
+    def _index(self, question_id, question):
+        if self._indexed:
+            self._add_to_indexes(question_id, *self._keys(question))
+
+    def _add_to_indexes(self, question_id, category, difficulty):
+        # Dicts double as insertion-ordered sets, so results keep bank order
+        # for appended questions and removal stays O(1).
+        self._by_category.setdefault(category, {})[question_id] = None
+        self._by_difficulty.setdefault(difficulty, {})[question_id] = None
+        self._by_category_difficulty.setdefault((category, difficulty), {})[question_id] = None
+        stratum = self._strata.setdefault((category, difficulty), [])
+        self._stratum_slots[question_id] = len(stratum)
+        stratum.append(question_id)
+
+    def _unindex(self, question_id, question):
+        if not self._indexed:
+            return
+        category, difficulty = self._keys(question)
+        for index, key in ((self._by_category, category),
+                           (self._by_difficulty, difficulty),
+                           (self._by_category_difficulty, (category, difficulty))):
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(question_id, None)
+                if not ids:
+                    del index[key]
+        stratum = self._strata.get((category, difficulty))
+        slot = self._stratum_slots.pop(question_id, None)
+        if stratum is not None and slot is not None:
+            last = stratum.pop()
+            if last != question_id:
+                stratum[slot] = last
+                self._stratum_slots[last] = slot
+            if not stratum:
+                del self._strata[(category, difficulty)]
+
+class QuestionSnapshot:
+    def __init__(self, order, items, source):
+        self._order = order
+        self._items = items
+        self._source = source
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        for _, question in self.items():
+            yield question
 
+    def items(self):
+        for question_id in self._order:
+            question = self._items.get(question_id)
+            yield question_id, question if question is not None else self._source[question_id]
+
+@metrics.instrument('search_questions')
+def search_questions(questions, query, prefix=True):
+    if isinstance(questions, QuestionBank):
+        return [questions.get_by_id(question_id) for question_id in questions.search(query, prefix)]
+    words = search_terms(query)
+    if not words:
+        return []
+    last = words.pop() if prefix else None
+    matches = []
+    for question in questions:
+        terms = question_terms(question)
+        if all(word in terms for word in words) and (last is None or any(term.startswith(last) for term in terms)):
+            matches.append(question)
+    return matches
+
+@metrics.instrument('filter_questions')
 def filter_questions(questions, category=None, difficulty=None):
+    if isinstance(questions, QuestionBank):
+        return questions.filter(category, difficulty)
+    category = normalize_key(category)
+    difficulty = normalize_key(difficulty)
     filtered = []
     for question in questions:
-        if (category is None or question['category'] == category) and \
-           (difficulty is None or question['difficulty'] == difficulty):
+        if (category is None or normalize_key(question['category']) == category) and \
+           (difficulty is None or normalize_key(question['difficulty']) == difficulty):
             filtered.append(question)
     return filtered
 
+DIFFICULTY_LEVELS = ('easy', 'medium', 'hard')
+
+class QuestionSampler:
+    # Draws quiz sessions from a QuestionBank without copying it. Each
+    # (category, difficulty) stratum gets a share of the draws in proportion
+    # to category_weights[category] * difficulty_weights[difficulty]
+    # (missing keys weigh 1, zero excludes). Questions a user saw in their
+    # last `recent_limit` draws are avoided while anything else is left.
+    def __init__(self, bank, category_weights=None, difficulty_weights=None, recent_limit=200, rng=None):
+        self.bank = bank if isinstance(bank, QuestionBank) else QuestionBank(bank)
+        self.category_weights = {normalize_key(key): value for key, value in (category_weights or {}).items()}
+        self.difficulty_weights = {normalize_key(key): value for key, value in (difficulty_weights or {}).items()}
+        self.recent_limit = recent_limit
+        self.rng = rng or random.Random()
+        self._recent = {}
+
+    def sample(self, username, k):
+        strata = self.bank.strata()
+        weights = {key: self._weight(key) for key in strata}
+        weights = {key: weight for key, weight in weights.items() if weight > 0}
+        recent = self._recent.get(username, {})
+        k = min(k, sum(strata[key] for key in weights))
+
+        # Fill from unseen questions first, then top up with recent ones.
+        fresh = dict(strata)
+        for key in recent.values():
+            if key in fresh:
+                fresh[key] -= 1
+        counts = self._allocate(fresh, weights, min(k, sum(fresh[key] for key in weights)), dict.fromkeys(weights, 0))
+        counts = self._allocate(strata, weights, k - sum(counts.values()), counts)
+
+        drawn = []
+        for key, count in counts.items():
+            drawn.extend(self._draw(key, strata[key], count, recent))
+        self.rng.shuffle(drawn)
+        self._remember(username, drawn)
+        return [self.bank.get_by_id(question_id) for question_id, _ in drawn]
+
+    def adaptive_difficulty(self, score, answered):
+        levels = self.difficulty_levels()
+        if not levels:
+            return None
+        if answered == 0:
+            return levels[0]
+        return levels[min(int(score / answered * len(levels)), len(levels) - 1)]
+
+    def next_adaptive(self, username, score, answered):
+        difficulty = self.adaptive_difficulty(score, answered)
+        if difficulty is None:
+            return None
+        strata = self.bank.strata()
+        weights = {key: self._weight(key) for key in strata if key[1] == difficulty}
+        weights = {key: weight for key, weight in weights.items() if weight > 0}
+        if not weights:
+            return None
+        key = self.rng.choices(list(weights), list(weights.values()))[0]
+        drawn = self._draw(key, strata[key], 1, self._recent.get(username, {}))
+        self._remember(username, drawn)
+        return self.bank.get_by_id(drawn[0][0])
+
+    def difficulty_levels(self):
+        present = set(self.bank.difficulties())
+        levels = [level for level in DIFFICULTY_LEVELS if level in present]
+        return levels + sorted(present.difference(DIFFICULTY_LEVELS))
+
+    def _weight(self, key):
+        category, difficulty = key
+        return self.category_weights.get(category, 1) * self.difficulty_weights.get(difficulty, 1)
+
+    def _allocate(self, capacities, weights, k, counts):
+        # One weighted pick per draw over the (few) strata; a stratum that
+        # reaches its capacity drops out of the remaining picks.
+        keys = list(weights)
+        active = [weights[key] if counts[key] < capacities[key] else 0 for key in keys]
+        for _ in range(k):
+            index = self.rng.choices(range(len(keys)), active)[0]
+            key = keys[index]
+            counts[key] += 1
+            if counts[key] >= capacities[key]:
+                active[index] = 0
+        return counts
+
+    def _draw(self, key, size, count, recent):
+        # Rejection-sample slots so the cost follows `count`, not `size`.
+        # Once fresh questions look exhausted, recently seen ones are allowed.
+        chosen = {}
+        attempts = 0
+        limit = 4 * count + len(recent)
+        while len(chosen) < count:
+            slot = self.rng.randrange(size)
+            if slot in chosen:
+                continue
+            question_id = self.bank.stratum_id(key, slot)
+            attempts += 1
+            if question_id in recent and attempts <= limit:
+                continue
+            chosen[slot] = question_id
+        return [(question_id, key) for question_id in chosen.values()]
+
+    def _remember(self, username, drawn):
+        # Recent ids map to their stratum so fresh capacity is cheap to count.
+        recent = self._recent.setdefault(username, {})
+        for question_id, key in drawn:
+            recent.pop(question_id, None)
+            recent[question_id] = key
+        while len(recent) > self.recent_limit:
+            del recent[next(iter(recent))]
+
+@metrics.instrument('ask_question')
 def ask_question(question, choice):
+    if isinstance(question, Question):
+        return question.is_correct(choice)
     return question['options'][choice - 1] == question['answer']
 
+@metrics.instrument('add_question')
 def add_question(questions, category, difficulty, text, options, answer, feedback):
     questions.append({
         'category': category,
@@ -42,42 +704,443 @@ def add_question(questions, category, difficulty, text, options, answer, feedbac
     return questions
 
 
+@metrics.instrument('delete_question')
 def delete_question(questions, index):
     if 0 <= index < len(questions):
         questions.pop(index)
     return questions
 
-def get_leaderboard(users):
-    return sorted(users, key=lambda x: x['score'], reverse=True)
+LEADERBOARD_BLOCK = 512
+
+class Leaderboard:
+    # Entries are (-score, username), kept sorted across blocks of at most
+    # 2 * LEADERBOARD_BLOCK. _maxes holds each block's last entry and _tree
+    # is a Fenwick tree over block lengths, so finding, inserting or
+    # removing an entry is a binary search plus a shift within one small
+    # block, and positions come from a prefix sum instead of a scan.
+    def __init__(self, scores=()):
+        self._scores = dict(scores)
+        entries = sorted((-score, username) for username, score in self._scores.items())
+        self._blocks = [entries[i:i + LEADERBOARD_BLOCK] for i in range(0, len(entries), LEADERBOARD_BLOCK)]
+        self._rebuild()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, username):
+        return username in self._scores
+
+    def update(self, username, score):
+        previous = self._scores.get(username)
+        if previous == score:
+            return
+        if previous is not None:
+            self._remove_entry((-previous, username))
+        self._scores[username] = score
+        self._insert_entry((-score, username))
+
+    def remove(self, username):
+        score = self._scores.pop(username, None)
+        if score is not None:
+            self._remove_entry((-score, username))
+
+    def top(self, k=None):
+        return self._slice(0, len(self) if k is None else k)
+
+    def page(self, start, count):
+        return self._slice(start, start + count)
+
+    def rank(self, username):
+        score = self._scores.get(username)
+        if score is None:
+            return None
+        # Players on the same score share a rank.
+        return self._position((-score,)) + 1
+
+    def around(self, username, radius=2):
+        score = self._scores.get(username)
+        if score is None:
+            return []
+        position = self._position((-score, username))
+        return self._slice(max(position - radius, 0), position + radius + 1)
+
+    def _rebuild(self):
+        # Called when blocks are split or dropped, which happens at most
+        # once per LEADERBOARD_BLOCK updates.
+        self._maxes = [block[-1] for block in self._blocks]
+        tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _add_length(self, block_index, delta):
+        i = block_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix_length(self, block_index):
+        total = 0
+        i = block_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        # Block index and offset of the entry at a global position.
+        block_index = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            following = block_index + step
+            if following < len(self._tree) and self._tree[following] <= position:
+                block_index = following
+                position -= self._tree[following]
+            step >>= 1
+        return block_index, position
+
+    def _position(self, entry):
+        block_index = bisect_left(self._maxes, entry)
+        if block_index == len(self._blocks):
+            return len(self)
+        return self._prefix_length(block_index) + bisect_left(self._blocks[block_index], entry)
+
+    def _slice(self, start, stop):
+        result = []
+        if start >= stop or start >= len(self):
+            return result
+        block_index, offset = self._locate(start)
+        remaining = stop - start
+        while remaining > 0 and block_index < len(self._blocks):
+            entries = self._blocks[block_index][offset:offset + remaining]
+            result.extend((username, -score) for score, username in entries)
+            remaining -= len(entries)
+            block_index += 1
+            offset = 0
+        return result
+
+    def _insert_entry(self, entry):
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._rebuild()
+            return
+        block_index = min(bisect_left(self._maxes, entry), len(self._blocks) - 1)
+        block = self._blocks[block_index]
+        insort(block, entry)
+        self._maxes[block_index] = block[-1]
+        if len(block) > 2 * LEADERBOARD_BLOCK:
+            self._blocks[block_index:block_index + 1] = [block[:LEADERBOARD_BLOCK], block[LEADERBOARD_BLOCK:]]
+            self._rebuild()
+        else:
+            self._add_length(block_index, 1)
+
+    def _remove_entry(self, entry):
+        block_index = bisect_left(self._maxes, entry)
+        block = self._blocks[block_index]
+        del block[bisect_left(block, entry)]
+        if block:
+            self._maxes[block_index] = block[-1]
+            self._add_length(block_index, -1)
+        else:
+            del self._blocks[block_index]
+            self._rebuild()
+
+class UserStore:
+    def __init__(self, users=(), journal=None):
+        self._users = {user['username']: user for user in users}
+        # Sorted once here; later changes go through leaderboard.update.
+        self.leaderboard = Leaderboard((username, user['score']) for username, user in self._users.items())
+        # Attached after loading so the initial users are not re-journaled.
+        self.journal = journal
+
+    def __len__(self):
+        return len(self._users)
+
+    def __iter__(self):
+        return iter(self._users.values())
+
+    def __contains__(self, username):
+        return username in self._users
+
+    def append(self, user):
+        self._users[user['username']] = user
+        self.leaderboard.update(user['username'], user['score'])
+
+    def find(self, username):
+        return self._users.get(username)
 
+    def add_user(self, username):
+        user = self._users.get(username)
+        if user is None:
+            user = {'username': username, 'score': 0, 'current_game': ''}
+            self.append(user)
+            self._record_put(user)
+        return user
+
+    def delete(self, username):
+        self.leaderboard.remove(username)
+        user = self._users.pop(username, None)
+        if user is not None and self.journal is not None:
+            self.journal.record_delete(username)
+            self._maybe_compact()
+        return user
+
+    def update_best_score(self, username, score):
+        user = self._users.get(username)
+        if user and score > user['score']:
+            user['score'] = score
+            self.leaderboard.update(username, score)
+            self._record_put(user)
+        return user
+
+    def best_score(self, username):
+        user = self._users.get(username)
+        return user['score'] if user else 0
+
+    def set_current_game(self, username, game_id):
+        user = self._users.get(username)
+        if user:
+            user['current_game'] = game_id
+            self._record_put(user)
+        return user
+
+    def current_game(self, username):
+        user = self._users.get(username)
+        return user['current_game'] if user else None
+
+    def top(self, k=None):
+        return [self._users[username] for username, _ in self.leaderboard.top(k)]
+
+    def page(self, start, count):
+        return [self._users[username] for username, _ in self.leaderboard.page(start, count)]
+
+    def rank(self, username):
+        return self.leaderboard.rank(username)
+
+    def around(self, username, radius=2):
+        return [self._users[name] for name, _ in self.leaderboard.around(username, radius)]
+
+    def compact(self):
+        if self.journal is not None:
+            self.journal.compact(self)
+
+    def _record_put(self, user):
+        if self.journal is not None:
+            self.journal.record_put(user)
+            self._maybe_compact()
+
+    def _maybe_compact(self):
+        if self.journal.needs_compaction():
+            self.compact()
+
+def open_questions(filename, compact=False, writer=None):
+    # A SQLite bank is updated row by row as the bank changes; a TOML bank
+    # has no journal and is written whole with save_questions.
+    if is_sqlite(filename):
+        storage = get_storage(filename)
+        rows = storage.load_question_rows()
+        questions = [question for _, question in rows]
+        # The bank numbers questions from 0 in load order.
+        journal = SqliteQuestionJournal(storage, {question_id: row_id for question_id, (row_id, _) in enumerate(rows)})
+        if writer is not None:
+            journal = QueuedJournal(journal, writer)
+        return QuestionBank(compact_questions(questions) if compact else questions, journal=journal)
+    return QuestionBank(load_questions(filename, cached=True, compact=compact))
+
+def open_users(filename, compact_every=1000, writer=None):
+    if is_sqlite(filename):
+        # SQLite updates rows in place, so the storage itself takes the
+        # per-mutation records.
+        storage = get_storage(filename)
+        users, journal = storage.load_users(), storage
+    else:
+        users, journal = load_users(filename), UserJournal(filename, compact_every)
+    if writer is not None:
+        journal = QueuedJournal(journal, writer)
+    return UserStore(users, journal=journal)
+
+@metrics.instrument('get_leaderboard')
+def get_leaderboard(users, limit=None):
+    if isinstance(users, UserStore):
+        return users.top(limit)
+    leaderboard = sorted(users, key=lambda x: x['score'], reverse=True)
+    return leaderboard if limit is None else leaderboard[:limit]
+
+@metrics.instrument('get_user_rank')
+def get_user_rank(users, username):
+    if isinstance(users, UserStore):
+        return users.rank(username)
+    user = find_user(users, username)
+    if user is None:
+        return None
+    return sum(1 for other in users if other['score'] > user['score']) + 1
+
+@metrics.instrument('find_user')
 def find_user(users, username):
+    if isinstance(users, UserStore):
+        return users.find(username)
     for user in users:
         if user['username'] == username:
             return user
     return None
 
+@metrics.instrument('delete_user')
 def delete_user(users, username):
+    if isinstance(users, UserStore):
+        users.delete(username)
+        return users
     users = [user for user in users if user['username'] != username]
     return users
 
+@metrics.instrument('update_user_best_score')
 def update_user_best_score(users, username, score):
+    if isinstance(users, UserStore):
+        users.update_best_score(username, score)
+        return users
     user = find_user(users, username)
     if user:
         if score > user['score']:
             user['score'] = score
     return users
 
+@metrics.instrument('get_user_best_score')
 def get_user_best_score(users, username):
     user = find_user(users, username)
     return user['score'] if user else 0
 
-def start_multiplayer_game(users, user1, user2):
+class MultiplayerGame:
+    __slots__ = ('game_id', 'players', 'scores', 'last_active')
+
+    def __init__(self, game_id, players, scores=None, last_active=0.0):
+        self.game_id = game_id
+        self.players = tuple(players)
+        self.scores = scores if scores is not None else {player: 0 for player in players}
+        self.last_active = last_active
+
+    def to_dict(self):
+        return {'game_id': self.game_id, 'players': list(self.players), 'scores': self.scores}
+
+class GameRegistry:
+    # Games are ordered by last activity, so expiry only looks at the
+    # oldest entries. IDs embed a counter that is never reused, and it is
+    # saved with the games so it survives restarts.
+    def __init__(self, idle_timeout=3600, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._games = OrderedDict()
+        self._by_player = {}
+        self._next_id = 1
+
+    def __len__(self):
+        return len(self._games)
+
+    def __contains__(self, game_id):
+        return self._live(game_id) is not None
+
+    def create(self, user1, user2):
+        self.expire_idle()
+        game_id = f"{user1}_{user2}_{self._next_id}"
+        self._next_id += 1
+        game = MultiplayerGame(game_id, (user1, user2), last_active=self.clock())
+        for player in game.players:
+            self._leave(player)
+            self._by_player[player] = game_id
+        self._games[game_id] = game
+        return game
+
+    def get(self, game_id):
+        return self._live(game_id)
+
+    def game_for(self, username):
+        game_id = self._by_player.get(username)
+        return self._live(game_id) if game_id is not None else None
+
+    def record_score(self, game_id, username, points=1):
+        game = self._live(game_id)
+        if game is None or username not in game.scores:
+            return None
+        game.scores[username] += points
+        self._touch(game)
+        return game
+
+    def end(self, game_id):
+        game = self._games.pop(game_id, None)
+        if game is not None:
+            for player in game.players:
+                if self._by_player.get(player) == game_id:
+                    del self._by_player[player]
+        return game
+
+    def expire_idle(self, now=None):
+        now = self.clock() if now is None else now
+        expired = []
+        while self._games:
+            game = next(iter(self._games.values()))
+            if now - game.last_active < self.idle_timeout:
+                break
+            expired.append(self.end(game.game_id))
+        return expired
+
+    def save(self, filename):
+        data = {'next_id': self._next_id, 'games': [game.to_dict() for game in self._games.values()]}
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'w') as file:
+            json.dump(data, file)
+        os.replace(temp_filename, filename)
+
+    def load(self, filename):
+        with open(filename, 'r') as file:
+            data = json.load(file)
+        self._next_id = max(self._next_id, data['next_id'])
+        now = self.clock()
+        for entry in data['games']:
+            game = MultiplayerGame(entry['game_id'], entry['players'], entry['scores'], now)
+            self._games[game.game_id] = game
+            for player in game.players:
+                self._by_player[player] = game.game_id
+        return self
+
+    def _live(self, game_id):
+        # Lookups end a game that has gone idle instead of returning (and
+        # possibly reviving) it between expire_idle sweeps.
+        game = self._games.get(game_id)
+        if game is not None and self.clock() - game.last_active >= self.idle_timeout:
+            self.end(game_id)
+            return None
+        return game
+
+    def _touch(self, game):
+        game.last_active = self.clock()
+        self._games.move_to_end(game.game_id)
+
+    def _leave(self, username):
+        game = self.game_for(username)
+        if game is not None:
+            del self._by_player[username]
+            if not any(self._by_player.get(player) == game.game_id for player in game.players):
+                del self._games[game.game_id]
+
+@metrics.instrument('start_multiplayer_game')
+def start_multiplayer_game(users, user1, user2, registry=None):
+    if registry is not None:
+        return users, registry.create(user1, user2).game_id
     game_id = f"{user1}_{user2}_{random.randint(1000, 9999)}"
+    if isinstance(users, UserStore):
+        users.set_current_game(user1, game_id)
+        users.set_current_game(user2, game_id)
+        return users, game_id
     for user in users:
         if user['username'] in [user1, user2]:
             user['current_game'] = game_id
     return users, game_id
 
-def get_current_game(users, username):
+@metrics.instrument('get_current_game')
+def get_current_game(users, username, registry=None):
+    if registry is not None:
+        game = registry.game_for(username)
+        return game.game_id if game else None
     user = find_user(users, username)
     return user['current_game'] if user else None
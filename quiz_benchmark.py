@@ -0,0 +1,174 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import quiz_backend as backend
+
+SCALES = (1000, 100000, 1000000)
+CATEGORIES = ("Geography", "Mathematics", "Literature", "History", "Science", "Art", "Music", "Sports")
+DIFFICULTIES = ("easy", "Easy", "medium", "hard")
+
+def generate_questions(count, seed=0):
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        options = [f"Option {i}-{j}" for j in range(4)]
+        questions.append({
+            'category': rng.choice(CATEGORIES),
+            'difficulty': rng.choice(DIFFICULTIES),
+            'text': f"Synthetic question {i}?",
+            'options': options,
+            'answer': rng.choice(options),
+            'feedback': f"Feedback for question {i}."
+        })
+    return questions
+
+def generate_users(count, seed=0):
+    rng = random.Random(seed)
+    return [{'username': f"player{i}", 'score': rng.randint(0, 50), 'current_game': ""} for i in range(count)]
+
+def best_time(func, repeat, setup=None):
+    # With setup, each repeat times func(setup()) on fresh state, for
+    # operations whose later repeats would otherwise be no-ops.
+    timings = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        start = time.perf_counter()
+        if setup is not None:
+            func(state)
+        else:
+            func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_io_benchmarks(size, questions, users, repeat, record):
+    with tempfile.TemporaryDirectory() as directory:
+        questions_file = os.path.join(directory, 'questions.toml')
+        users_file = os.path.join(directory, 'users.toml')
+        record('save_questions', size, best_time(lambda: backend.save_questions(questions_file, questions), repeat))
+        record('load_questions', size, best_time(lambda: backend.load_questions(questions_file), repeat))
+        record('save_users', size, best_time(lambda: backend.save_users(users_file, users), repeat))
+        record('load_users', size, best_time(lambda: backend.load_users(users_file), repeat))
+
+def run_lookup_benchmarks(size, questions, users, repeat, lookups, record):
+    rng = random.Random(size)
+    bank = backend.QuestionBank(questions)
+    store = backend.UserStore([dict(user) for user in users])
+    filters = [(rng.choice(CATEGORIES), rng.choice(DIFFICULTIES)) for _ in range(lookups)]
+    names = [f"player{rng.randrange(size)}" for _ in range(lookups)]
+    # Generated users score at most 50, so every update raises a best score.
+    scores = [rng.randint(51, 100) for _ in range(lookups)]
+    fresh = {'list': lambda: [dict(user) for user in users],
+             'store': lambda: backend.UserStore([dict(user) for user in users])}
+
+    compact = backend.QuestionBank(backend.compact_questions(questions))
+    for label, source in (('list', questions), ('bank', bank), ('compact', compact)):
+        record(f'filter_questions[{label}]', size, best_time(
+            lambda: [backend.filter_questions(source, category, difficulty) for category, difficulty in filters], repeat) / lookups)
+    for label, source in (('list', users), ('store', store)):
+        record(f'get_leaderboard[{label}]', size, best_time(lambda: backend.get_leaderboard(source, 10), repeat))
+        record(f'find_user[{label}]', size, best_time(
+            lambda: [backend.find_user(source, name) for name in names], repeat) / lookups)
+        record(f'update_user_best_score[{label}]', size, best_time(
+            lambda target: [backend.update_user_best_score(target, name, score) for name, score in zip(names, scores)],
+            repeat, fresh[label]) / lookups)
+
+_worker_questions = None
+
+def _init_player(size, seed):
+    global _worker_questions
+    _worker_questions = generate_questions(size, seed)
+
+def _simulate_player(args):
+    answers, seed = args
+    rng = random.Random(seed)
+    questions = _worker_questions
+    start = time.perf_counter()
+    correct = 0
+    for _ in range(answers):
+        question = questions[rng.randrange(len(questions))]
+        if backend.ask_question(question, rng.randint(1, len(question['options']))):
+            correct += 1
+    return time.perf_counter() - start, correct
+
+def run_traffic_benchmark(size, processes, players, answers, record):
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes, initializer=_init_player, initargs=(size, 0)) as pool:
+        timings = pool.map(_simulate_player, [(answers, seed) for seed in range(players)])
+    wall = time.perf_counter() - start
+    # Per-answer latency comes from the workers' own clocks, so bank
+    # generation in the pool initializer is not counted.
+    busy = sum(elapsed for elapsed, _ in timings)
+    record(f'ask_question[traffic x{processes}]', size, busy / (players * answers),
+           answers=players * answers, wall_seconds=wall)
+
+def run(sizes, repeat=3, lookups=100, processes=1, players=8, answers=10000, io=True):
+    results = []
+
+    def record(name, size, seconds, **extra):
+        results.append({'name': name, 'size': size, 'seconds': seconds, **extra})
+        print(f"{name:<40} {size:>9} {seconds * 1e6:>14.2f} us", flush=True)
+
+    for size in sizes:
+        questions = generate_questions(size)
+        users = generate_users(size)
+        if io:
+            run_io_benchmarks(size, questions, users, repeat, record)
+        run_lookup_benchmarks(size, questions, users, repeat, lookups, record)
+        run_traffic_benchmark(size, processes, players, answers, record)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+def compare(baseline, current, threshold):
+    previous = {(result['name'], result['size']): result['seconds'] for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        key = (result['name'], result['size'])
+        if key not in previous or previous[key] == 0:
+            continue
+        ratio = result['seconds'] / previous[key]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{result['name']:<40} {result['size']:>9} {ratio:>8.2f}x {flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quiz_backend on synthetic data")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in SCALES),
+                        help="comma-separated bank/user-base sizes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="worker processes simulating players")
+    parser.add_argument('--players', type=int, default=8)
+    parser.add_argument('--answers', type=int, default=10000, help="answers submitted per player")
+    parser.add_argument('--no-io', action='store_true', help="skip TOML load/save timings")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="slowdown ratio above which a result counts as a regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    current = run(sizes, args.repeat, args.lookups, args.processes, args.players, args.answers, not args.no_io)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if compare(baseline, current, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import toml
+import quiz_metrics as metrics
+from quiz_backend import normalize_key
+from quiz_storage import TomlStorage, get_storage
+
+FIELDS = ('category', 'difficulty', 'text', 'options', 'answer', 'feedback')
+FORMATS = ('jsonl', 'csv', 'toml')
+MAX_REPORTED_ERRORS = 100
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+
+    def reject(self, record_number, error):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((record_number, str(error)))
+
+    def __str__(self):
+        return f"Imported {self.imported} questions, skipped {self.duplicates} duplicates and {self.invalid} invalid records"
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower().lstrip('.')
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported question file format: {filename}")
+    return extension
+
+# Each format has a reader that yields raw records and a parser that
+# turns one raw record into a question dict. They are kept apart so a
+# record that fails to parse is rejected on its own instead of ending the
+# whole import.
+def read_jsonl(filename):
+    with open(filename, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield line
+
+def parse_jsonl(line):
+    return json.loads(line)
+
+def read_csv(filename):
+    # A malformed row is passed on as its csv.Error so it is rejected like
+    # any other bad record; the reader carries on with the next line.
+    with open(filename, 'r', encoding='utf-8', newline='') as file:
+        rows = csv.DictReader(file)
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                row = error
+            yield row
+
+def parse_csv(row):
+    if isinstance(row, csv.Error):
+        raise row
+    # Options are either a JSON list or separated by '|'.
+    options = (row.get('options') or '').strip()
+    if options.startswith('['):
+        row['options'] = json.loads(options)
+    else:
+        row['options'] = [option.strip() for option in options.split('|') if option.strip()]
+    return row
+
+def read_toml(filename):
+    return TomlStorage(filename).iter_question_blocks()
+
+def parse_toml(block):
+    questions = toml.loads(block).get('question', [])
+    if len(questions) != 1:
+        raise ValueError("Expected one [[question]] table")
+    return questions[0]
+
+READERS = {'jsonl': (read_jsonl, parse_jsonl), 'csv': (read_csv, parse_csv), 'toml': (read_toml, parse_toml)}
+
+def read_questions(filename, format=None):
+    read, parse = READERS[format or detect_format(filename)]
+    return map(parse, read(filename))
+
+def validate_question(record):
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+    question = {}
+    for field in ('category', 'difficulty', 'text', 'answer'):
+        value = record.get(field)
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError(f"Missing {field}")
+        question[field] = value.strip()
+    options = record.get('options')
+    if not isinstance(options, (list, tuple)) or not options:
+        raise ValueError("Missing options")
+    question['options'] = [str(option).strip() for option in options]
+    if question['answer'] not in question['options']:
+        raise ValueError("Answer is not one of the options")
+    question['category'] = ' '.join(question['category'].split())
+    question['difficulty'] = normalize_key(question['difficulty'])
+    question['feedback'] = str(record.get('feedback') or '').strip()
+    return {field: question[field] for field in FIELDS}
+
+def content_hash(question):
+    # Feedback is left out: the same question with reworded feedback is
+    # still a duplicate. A 64-bit int keeps the seen-set small.
+    key = json.dumps([normalize_key(question['category']), normalize_key(question['difficulty']),
+                      ' '.join(question['text'].split()).lower(), question['options'], question['answer']])
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+@metrics.instrument('import_questions')
+def import_questions(source, target, format=None):
+    storage = get_storage(target)
+    seen = set()
+    for question in storage.iter_questions():
+        seen.add(content_hash(question))
+    report = ImportReport()
+
+    read, parse = READERS[format or detect_format(source)]
+
+    def accepted():
+        for record_number, record in enumerate(read(source), 1):
+            try:
+                question = validate_question(parse(record))
+            except (ValueError, TypeError, AttributeError, csv.Error) as error:
+                report.reject(record_number, error)
+                continue
+            digest = content_hash(question)
+            if digest in seen:
+                report.duplicates += 1
+                continue
+            seen.add(digest)
+            report.imported += 1
+            yield question
+
+    # The generator streams straight into one batched write.
+    storage.append_questions(accepted())
+    return report
+
+def write_jsonl(questions, file):
+    for question in questions:
+        file.write(json.dumps(dict(question)) + '\n')
+
+def write_csv(questions, file):
+    writer = csv.DictWriter(file, fieldnames=FIELDS)
+    writer.writeheader()
+    for question in questions:
+        row = {field: question[field] for field in FIELDS}
+        row['options'] = json.dumps(list(question['options']))
+        writer.writerow(row)
+
+def write_toml(questions, file):
+    for question in questions:
+        file.write(toml.dumps({'question': [dict(question)]}) + '\n')
+
+WRITERS = {'jsonl': write_jsonl, 'csv': write_csv, 'toml': write_toml}
+
+@metrics.instrument('export_questions')
+def export_questions(questions, filename, format=None):
+    # questions may be any iterable, or a storage filename to stream from.
+    if isinstance(questions, str):
+        questions = get_storage(questions).iter_questions()
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'w', encoding='utf-8', newline='') as file:
+        WRITERS[format or detect_format(filename)](questions, file)
+    os.replace(temp_filename, filename)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export of quiz questions")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="append questions from a JSONL, CSV or TOML file")
+    import_parser.add_argument('source')
+    export_parser = subparsers.add_parser('export', help="write the question bank as JSONL, CSV or TOML")
+    export_parser.add_argument('output')
+    for subparser in (import_parser, export_parser):
+        subparser.add_argument('--bank', default='questions.toml', help="question bank file or SQLite database")
+        subparser.add_argument('--format', choices=FORMATS)
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        report = import_questions(args.source, args.bank, args.format)
+        print(report)
+        for record_number, error in report.errors:
+            print(f"  record {record_number}: {error}")
+    else:
+        export_questions(args.bank, args.output, args.format)
+
+if __name__ == "__main__":
+    main()
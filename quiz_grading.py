@@ -0,0 +1,47 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class AnswerKey:
+    # correct[q, j] says whether option j of question q is the answer, so a
+    # batch of (question_id, choice) pairs is graded with one fancy index.
+    # question_id is the question's position in the list the key was built from.
+    def __init__(self, questions):
+        if np is None:
+            raise ImportError("Batch grading requires numpy (pip install numpy)")
+        questions = list(questions)
+        width = max((len(question['options']) for question in questions), default=0)
+        self.option_counts = np.zeros(len(questions), dtype=np.int64)
+        self.correct = np.zeros((len(questions), max(width, 1)), dtype=bool)
+        for question_id, question in enumerate(questions):
+            options = question['options']
+            self.option_counts[question_id] = len(options)
+            for position, option in enumerate(options):
+                if option == question['answer']:
+                    self.correct[question_id, position] = True
+
+    def __len__(self):
+        return len(self.option_counts)
+
+    def grade(self, question_ids, choices):
+        question_ids = np.asarray(question_ids, dtype=np.int64)
+        choices = np.asarray(choices, dtype=np.int64)
+        if question_ids.shape != choices.shape:
+            raise ValueError("question_ids and choices must have the same length")
+        if question_ids.size and (question_ids.min() < 0 or question_ids.max() >= len(self)):
+            raise IndexError("question id out of range")
+        # Same indexing as ask_question's options[choice - 1], including
+        # negative positions counting from the end of the options.
+        counts = self.option_counts[question_ids]
+        positions = choices - 1
+        positions = np.where(positions < 0, positions + counts, positions)
+        if np.any((positions < 0) | (positions >= counts)):
+            raise IndexError("choice out of range")
+        return self.correct[question_ids, positions]
+
+def grade_submissions(answer_key, usernames, question_ids, choices):
+    correct = answer_key.grade(question_ids, choices)
+    names, inverse = np.unique(np.asarray(usernames, dtype=object), return_inverse=True)
+    totals = np.bincount(inverse.ravel(), weights=correct, minlength=len(names)).astype(np.int64)
+    return correct, dict(zip(names.tolist(), totals.tolist()))
@@ -1,17 +1,116 @@
+import threading
+import time
 import tkinter as tk
-from tkinter import simpledialog, messagebox
+from tkinter import simpledialog, messagebox, ttk
 import quiz_backend as backend
+import quiz_metrics as metrics
+from quiz_storage import BackgroundWriter
+
+LEADERBOARD_SIZE = 10
+QUIZ_LENGTH = 10
+PAGE_SIZE = 20
+SEARCH_DELAY = 150  # ms of typing pause before the question search runs
+
+# Indie game-like style palettes, keyed by the dark_mode flag
+THEMES = {
+    False: {
+        'bg': "#1e1e2f",  # dark navy
+        'fg': "#f0f0f0",  # off-white
+        'button_bg': "#6c5ce7",  # vibrant purple
+        'button_fg': "#f0f0f0",  # off-white
+    },
+    True: {
+        'bg': "#121212",  # almost black
+        'fg': "#dfe6e9",  # light gray
+        'button_bg': "#00cec9",  # bright teal
+        'button_fg': "#dfe6e9",  # light gray
+    },
+}
+THEME_FONT = ("Courier New", 12, "bold")
+
+# Start of the startup clock for the time-to-first-frame report
+STARTED_AT = time.perf_counter()
+
+class PagedList:
+    # Treeview that only ever holds one page of rows, so opening it costs
+    # the same whatever the size of the underlying collection.
+    def __init__(self, parent, columns, fetch, count, on_activate=None, page_size=PAGE_SIZE):
+        self.fetch = fetch
+        self.count = count
+        self.on_activate = on_activate
+        self.page_size = page_size
+        self.page = 0
+        self._keys = {}
+
+        self.frame = tk.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=[name for name, _, _ in columns], show="headings",
+                                 height=page_size, selectmode="browse")
+        for name, heading, width in columns:
+            self.tree.heading(name, text=heading)
+            self.tree.column(name, width=width, anchor="w")
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        if on_activate:
+            self.tree.bind("<Double-1>", self._activate)
+
+        nav_frame = tk.Frame(self.frame)
+        nav_frame.pack(fill=tk.X, pady=5)
+        tk.Button(nav_frame, text="Previous Page", command=lambda: self.show_page(self.page - 1), width=15).pack(side=tk.LEFT)
+        tk.Button(nav_frame, text="Next Page", command=lambda: self.show_page(self.page + 1), width=15).pack(side=tk.RIGHT)
+        self.page_label = tk.Label(nav_frame, font=("Arial", 12))
+        self.page_label.pack()
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def page_count(self):
+        return max((self.count() + self.page_size - 1) // self.page_size, 1)
+
+    def show_page(self, page):
+        self.page = min(max(page, 0), self.page_count() - 1)
+        self.refresh()
+
+    def refresh(self):
+        self.page = min(self.page, self.page_count() - 1)
+        self.tree.delete(*self.tree.get_children())
+        self._keys = {}
+        start = self.page * self.page_size
+        for offset, (key, values) in enumerate(self.fetch(start, self.page_size)):
+            iid = str(start + offset)
+            self._keys[iid] = key
+            self.tree.insert("", tk.END, iid=iid, values=values)
+        self.page_label.configure(text=f"Page {self.page + 1} of {self.page_count()}")
+
+    def selected(self):
+        selection = self.tree.selection()
+        return self._keys.get(selection[0]) if selection else None
+
+    def _activate(self, event):
+        key = self.selected()
+        if key is not None:
+            self.on_activate(key)
 
 class QuizApp:
-    def __init__(self, root):
+    def __init__(self, root, lazy=True):
         self.root = root
         self.root.title("Quiz Application")
+        self.root.protocol("WM_DELETE_WINDOW", self.exit_app)
 
         self.dark_mode = True  # Set dark mode as default for modern indie game UI
         self.developer_mode = False
 
-        self.questions = backend.load_questions('questions.toml')
-        self.users = backend.load_users('users.toml')
+        # All saves go through one background thread so the UI never waits on disk
+        self.writer = BackgroundWriter()
+        # Questions and users are loaded on first use (see the properties
+        # below) unless lazy is False.
+        self._questions = None
+        self._users = None
+        self._sampler = None
+        if not lazy:
+            self.load_questions()
+            self.load_users()
+        self.quiz_questions = []
+        self.search_building = False
+        self.games = backend.GameRegistry()
         self.current_user = None
         self.current_question_index = 0
         self.score = 0
@@ -20,22 +119,97 @@ class QuizApp:
         self.dev_mode_var = tk.BooleanVar(value=self.developer_mode)
         self.dark_mode_var = tk.BooleanVar(value=self.dark_mode)
 
+        # Theme options must be in place before any widget is created
+        self.theme = None
+        self.apply_theme()
+
         # Main container frame
         self.main_frame = tk.Frame(self.root)
         self.main_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Create subframes for different content areas
+        # Subframes for the different content areas, built on first use
         self.frames = {}
-        self.create_frames()
 
         # Show main menu frame initially
         self.show_frame("main_menu")
-
-    def create_frames(self):
-        # Main Menu Frame
-        main_menu = tk.Frame(self.main_frame)
-        self.frames["main_menu"] = main_menu
-
+        self.root.after_idle(self.record_startup)
+        self.check_save_errors()
+
+    @property
+    def questions(self):
+        if self._questions is None:
+            self.load_questions()
+        return self._questions
+
+    @questions.setter
+    def questions(self, questions):
+        self._questions = questions
+
+    @property
+    def users(self):
+        if self._users is None:
+            self.load_users()
+        return self._users
+
+    @users.setter
+    def users(self, users):
+        self._users = users
+
+    @property
+    def sampler(self):
+        if self._sampler is None:
+            self._sampler = backend.QuestionSampler(self.questions)
+        return self._sampler
+
+    @metrics.instrument('gui.load_questions')
+    def load_questions(self):
+        self._questions = backend.open_questions('questions.toml', compact=True, writer=self.writer)
+        self._sampler = None
+
+    def build_search_index(self):
+        # The text index for the Manage Questions search is built on a
+        # worker thread, the first time that screen opens, and installed
+        # from the Tk thread once done.
+        bank = self._questions
+        build = bank.search_builder()
+        result = []
+        self.search_building = True
+
+        def run():
+            try:
+                result.append(build())
+            except Exception:
+                result.append(None)
+
+        def install():
+            if not result:
+                self.root.after(100, install)
+                return
+            bank.install_search(result[0])
+            self.search_building = False
+
+        threading.Thread(target=run, daemon=True).start()
+        self.root.after(100, install)
+
+    @metrics.instrument('gui.load_users')
+    def load_users(self):
+        self._users = backend.open_users('users.toml', writer=self.writer)
+
+    def record_startup(self):
+        # Runs once the main menu has been laid out and drawn.
+        metrics.record('gui.time_to_first_frame', time.perf_counter() - STARTED_AT)
+
+    def get_frame(self, frame_name):
+        frame = self.frames.get(frame_name)
+        if frame is None:
+            frame = self.frames[frame_name] = tk.Frame(self.main_frame)
+            if frame_name == "main_menu":
+                self.create_main_menu(frame)
+            elif frame_name == "quiz":
+                self.create_quiz_widgets(frame)
+        return frame
+
+    def create_main_menu(self, main_menu):
         tk.Label(main_menu, text="Welcome to the Quiz App", font=("Arial", 18, "bold")).pack(pady=20)
 
         tk.Button(main_menu, text="Start Quiz", command=lambda: self.show_frame("quiz"), width=20, height=2).pack(pady=10)
@@ -47,36 +221,47 @@ class QuizApp:
         tk.Checkbutton(main_menu, text="Developer Mode", variable=self.dev_mode_var, command=self.toggle_developer_mode).pack(pady=10)
         tk.Checkbutton(main_menu, text="Dark Mode", variable=self.dark_mode_var, command=self.toggle_dark_mode).pack(pady=10)
 
-        tk.Button(main_menu, text="Exit", command=self.root.quit, width=20, height=2).pack(pady=10)
-
-        # Quiz Frame
-        quiz_frame = tk.Frame(self.main_frame)
-        self.frames["quiz"] = quiz_frame
-
-        # Manage Users Frame
-        manage_users = tk.Frame(self.main_frame)
-        self.frames["manage_users"] = manage_users
-
-        # Manage Questions Frame
-        manage_questions = tk.Frame(self.main_frame)
-        self.frames["manage_questions"] = manage_questions
-
-        # Leaderboard Frame
-        leaderboard = tk.Frame(self.main_frame)
-        self.frames["leaderboard"] = leaderboard
-
-        # Multiplayer Frame
-        multiplayer = tk.Frame(self.main_frame)
-        self.frames["multiplayer"] = multiplayer
-
+        tk.Button(main_menu, text="Exit", command=self.exit_app, width=20, height=2).pack(pady=10)
+
+    def create_quiz_widgets(self, frame):
+        # Built once and updated in place for every question
+        self.question_frame = tk.Frame(frame)
+        self.question_label = tk.Label(self.question_frame, font=("Arial", 14))
+        self.question_label.pack(pady=10)
+        self.selected_option = tk.IntVar()
+        self.options_frame = tk.Frame(self.question_frame)
+        self.options_frame.pack(fill=tk.X)
+        self.option_buttons = []
+        tk.Button(self.question_frame, text="Submit Answer", command=self.submit_answer, width=20, height=2).pack(pady=10)
+        nav_frame = tk.Frame(self.question_frame)
+        nav_frame.pack(pady=10, fill=tk.X)
+        self.previous_button = tk.Button(nav_frame, text="Previous Question", command=self.previous_question, width=20, height=2)
+        self.next_button = tk.Button(nav_frame, text="Next Question", command=self.next_question, width=20, height=2)
+
+        self.end_frame = tk.Frame(frame)
+        tk.Label(self.end_frame, text="Thank You for Playing!", font=("Arial", 18, "bold")).pack(pady=20)
+        self.best_score_label = tk.Label(self.end_frame, font=("Arial", 14))
+        self.best_score_label.pack(pady=10)
+        self.rank_label = tk.Label(self.end_frame, font=("Arial", 14))
+        self.rank_label.pack(pady=10)
+        tk.Button(self.end_frame, text="View Leaderboard", command=lambda: self.show_frame("leaderboard"), width=20, height=2).pack(pady=10)
+        tk.Button(self.end_frame, text="Back to Main Menu", command=lambda: self.show_frame("main_menu"), width=20, height=2).pack(pady=10)
+
+    def set_visible(self, widget, visible, **pack_options):
+        packed = widget.winfo_manager() == "pack"
+        if visible and not packed:
+            widget.pack(**pack_options)
+        elif not visible and packed:
+            widget.pack_forget()
+
+    @metrics.instrument('gui.show_frame')
     def show_frame(self, frame_name):
         # Hide all frames
         for frame in self.frames.values():
             frame.pack_forget()
         # Show the requested frame
-        frame = self.frames[frame_name]
+        frame = self.get_frame(frame_name)
         frame.pack(fill=tk.BOTH, expand=True)
-        self.apply_theme()
 
         # Call frame-specific setup if needed
         if frame_name == "main_menu":
@@ -97,64 +282,60 @@ class QuizApp:
         self.dev_mode_var.set(self.developer_mode)
         self.dark_mode_var.set(self.dark_mode)
 
+    @metrics.instrument('gui.setup_quiz_frame')
     def setup_quiz_frame(self):
-        frame = self.frames["quiz"]
-        for widget in frame.winfo_children():
-            widget.destroy()
-
         self.current_user = simpledialog.askstring("User", "Enter your username:")
         if not self.current_user or self.current_user.strip() == "":
             messagebox.showwarning("Warning", "Username cannot be empty!")
             self.show_frame("main_menu")
             return
 
-        if not any(user['username'] == self.current_user for user in self.users):
-            self.users.append({"username": self.current_user, "score": 0, "current_game": ""})
-            backend.save_users('users.toml', self.users)
+        if self.current_user not in self.users:
+            self.users.add_user(self.current_user)
 
+        self.quiz_questions = self.sampler.sample(self.current_user, QUIZ_LENGTH)
         self.current_question_index = 0
         self.score = 0
 
         self.show_question()
 
+    @metrics.instrument('gui.show_question')
     def show_question(self):
-        frame = self.frames["quiz"]
-        for widget in frame.winfo_children():
-            widget.destroy()
-
-        if self.current_question_index < len(self.questions):
-            question = self.questions[self.current_question_index]
-
-            tk.Label(frame, text=question['text'], font=("Arial", 14)).pack(pady=10)
-            self.option_vars = []
-            self.selected_option = tk.IntVar()
-
-            for i, option in enumerate(question['options'], 1):
-                tk.Radiobutton(frame, text=option, variable=self.selected_option, value=i, font=("Arial", 12)).pack(anchor=tk.W)
-
-            tk.Button(frame, text="Submit Answer", command=self.submit_answer, width=20, height=2).pack(pady=10)
-
-            nav_frame = tk.Frame(frame)
-            nav_frame.pack(pady=10, fill=tk.X)
-
-            if self.current_question_index > 0:
-                tk.Button(nav_frame, text="Previous Question", command=self.previous_question, width=20, height=2).pack(side=tk.LEFT, padx=10)
-            if self.current_question_index < len(self.questions) - 1:
-                tk.Button(nav_frame, text="Next Question", command=self.next_question, width=20, height=2).pack(side=tk.RIGHT, padx=10)
+        if self.current_question_index < len(self.quiz_questions):
+            question = self.quiz_questions[self.current_question_index]
+            self.set_visible(self.end_frame, False)
+            self.set_visible(self.question_frame, True, fill=tk.BOTH, expand=True)
+
+            self.question_label.configure(text=question['text'])
+            self.selected_option.set(0)
+
+            options = question['options']
+            while len(self.option_buttons) < len(options):
+                self.option_buttons.append(tk.Radiobutton(self.options_frame, variable=self.selected_option,
+                                                          value=len(self.option_buttons) + 1, font=("Arial", 12)))
+            # Unused buttons are always a trailing run, so re-packing keeps order
+            for i, button in enumerate(self.option_buttons):
+                if i < len(options):
+                    button.configure(text=options[i])
+                self.set_visible(button, i < len(options), anchor=tk.W)
+
+            self.set_visible(self.previous_button, self.current_question_index > 0, side=tk.LEFT, padx=10)
+            self.set_visible(self.next_button, self.current_question_index < len(self.quiz_questions) - 1, side=tk.RIGHT, padx=10)
         else:
             self.end_quiz()
 
+    @metrics.instrument('gui.submit_answer')
     def submit_answer(self):
         choice = self.selected_option.get()
         if choice == 0:
             messagebox.showwarning("Warning", "Please select an option!")
             return
 
-        if backend.ask_question(self.questions[self.current_question_index], choice):
+        if backend.ask_question(self.quiz_questions[self.current_question_index], choice):
             self.score += 1
             messagebox.showinfo("Correct!", "Your answer is correct!")
         else:
-            messagebox.showinfo("Wrong!", f"The correct answer was: {self.questions[self.current_question_index]['answer']}")
+            messagebox.showinfo("Wrong!", f"The correct answer was: {self.quiz_questions[self.current_question_index]['answer']}")
 
         self.current_question_index += 1
         self.show_question()
@@ -165,24 +346,22 @@ class QuizApp:
             self.show_question()
 
     def next_question(self):
-        if self.current_question_index < len(self.questions) - 1:
+        if self.current_question_index < len(self.quiz_questions) - 1:
             self.current_question_index += 1
             self.show_question()
 
+    @metrics.instrument('gui.end_quiz')
     def end_quiz(self):
-        frame = self.frames["quiz"]
-        for widget in frame.winfo_children():
-            widget.destroy()
-
         self.users = backend.update_user_best_score(self.users, self.current_user, self.score)
-        backend.save_users('users.toml', self.users)
         best_score = backend.get_user_best_score(self.users, self.current_user)
+        rank = backend.get_user_rank(self.users, self.current_user)
 
-        tk.Label(frame, text="Thank You for Playing!", font=("Arial", 18, "bold")).pack(pady=20)
-        tk.Label(frame, text=f"Your Personal Best Score: {best_score}", font=("Arial", 14)).pack(pady=10)
-        tk.Button(frame, text="View Leaderboard", command=lambda: self.show_frame("leaderboard"), width=20, height=2).pack(pady=10)
-        tk.Button(frame, text="Back to Main Menu", command=lambda: self.show_frame("main_menu"), width=20, height=2).pack(pady=10)
+        self.best_score_label.configure(text=f"Your Personal Best Score: {best_score}")
+        self.rank_label.configure(text=f"Your Rank: {rank} of {len(self.users)}")
+        self.set_visible(self.question_frame, False)
+        self.set_visible(self.end_frame, True, fill=tk.BOTH, expand=True)
 
+    @metrics.instrument('gui.setup_manage_users_frame')
     def setup_manage_users_frame(self):
         frame = self.frames["manage_users"]
         for widget in frame.winfo_children():
@@ -195,22 +374,32 @@ class QuizApp:
 
         tk.Label(frame, text="Manage Users", font=("Arial", 18, "bold")).pack(pady=20)
 
-        for user in self.users:
-            user_frame = tk.Frame(frame)
-            user_frame.pack(pady=5)
-            tk.Label(user_frame, text=f"User: {user['username']}, Score: {user['score']}", font=("Arial", 12)).pack(side=tk.LEFT)
-            tk.Button(user_frame, text="Delete User", command=lambda u=user['username']: self.delete_user(u), width=15).pack(side=tk.RIGHT)
+        def fetch(start, count):
+            return [(user['username'], (user['username'], user['score'])) for user in self.users.page(start, count)]
+
+        self.users_list = PagedList(frame, [("username", "User", 250), ("score", "Score", 100)],
+                                    fetch, lambda: len(self.users))
+        self.users_list.pack(fill=tk.BOTH, expand=True, padx=20)
+        self.users_list.refresh()
+
+        def delete_selected():
+            username = self.users_list.selected()
+            if username is None:
+                messagebox.showwarning("Warning", "Please select a user!")
+                return
+            self.delete_user(username)
 
+        tk.Button(frame, text="Delete User", command=delete_selected, width=15).pack(pady=5)
         tk.Button(frame, text="Back to Main Menu", command=lambda: self.show_frame("main_menu"), width=20, height=2).pack(pady=10)
 
     def delete_user(self, username):
         self.users = backend.delete_user(self.users, username)
-        backend.save_users('users.toml', self.users)
-        self.setup_manage_users_frame()
+        self.users_list.refresh()
 
     def manage_users(self):
         self.show_frame("manage_users")
 
+    @metrics.instrument('gui.setup_manage_questions_frame')
     def setup_manage_questions_frame(self):
         frame = self.frames["manage_questions"]
         for widget in frame.winfo_children():
@@ -221,16 +410,73 @@ class QuizApp:
             self.show_frame("main_menu")
             return
 
+        if not self.search_building and not self.questions.search_ready():
+            self.build_search_index()
+
         tk.Label(frame, text="Manage Questions", font=("Arial", 18, "bold")).pack(pady=20)
 
         tk.Button(frame, text="Back", command=lambda: self.show_frame("main_menu"), width=10).pack(pady=5)
 
-        for idx, question in enumerate(self.questions):
-            question_frame = tk.Frame(frame)
-            question_frame.pack(pady=5, fill=tk.X, padx=20)
-
-            tk.Label(question_frame, text=f"{idx+1}. {question['text']}", font=("Arial", 12), anchor="w").pack(side=tk.LEFT, expand=True, fill=tk.X)
-            tk.Button(question_frame, text="Edit", command=lambda i=idx: self.edit_question(i), width=10).pack(side=tk.RIGHT, padx=5)
+        search_frame = tk.Frame(frame)
+        search_frame.pack(pady=5)
+        tk.Label(search_frame, text="Search:", font=("Arial", 12)).pack(side=tk.LEFT)
+        search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=search_var, font=("Arial", 12), width=40)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_status = tk.Label(search_frame, font=("Arial", 12))
+        search_status.pack(side=tk.LEFT)
+
+        # While a search is active the list shows question ids from the text
+        # index; otherwise it pages through the bank by position.
+        search = {'matches': None, 'pending': None}
+
+        def fetch(start, count):
+            matches = search['matches']
+            if matches is None:
+                return [(idx, (idx + 1, question['text'])) for idx, question in enumerate(self.questions[start:start + count], start)]
+            return [(question_id, ("", self.questions.get_by_id(question_id)['text']))
+                    for question_id in matches[start:start + count]]
+
+        def count():
+            matches = search['matches']
+            return len(self.questions) if matches is None else len(matches)
+
+        def open_question(key):
+            self.edit_question(key if search['matches'] is None else self.questions.position(key))
+
+        def run_search():
+            search['pending'] = None
+            if not search_entry.winfo_exists():
+                return
+            query = search_var.get()
+            if query.strip() and self.search_building and not self.questions.search_ready():
+                search_status.configure(text="Indexing questions...")
+                search['pending'] = self.root.after(SEARCH_DELAY, run_search)
+                return
+            search_status.configure(text="")
+            search['matches'] = self.questions.search(query) if query.strip() else None
+            self.questions_list.show_page(0)
+
+        def schedule_search(*args):
+            if search['pending'] is not None:
+                self.root.after_cancel(search['pending'])
+            search['pending'] = self.root.after(SEARCH_DELAY, run_search)
+
+        search_var.trace_add("write", schedule_search)
+
+        self.questions_list = PagedList(frame, [("number", "#", 60), ("text", "Question", 500)],
+                                        fetch, count, on_activate=open_question)
+        self.questions_list.pack(fill=tk.BOTH, expand=True, padx=20)
+        self.questions_list.refresh()
+
+        def edit_selected():
+            key = self.questions_list.selected()
+            if key is None:
+                messagebox.showwarning("Warning", "Please select a question!")
+                return
+            open_question(key)
+
+        tk.Button(frame, text="Edit", command=edit_selected, width=10).pack(pady=5)
 
         tk.Label(frame, text="Add New Question:", font=("Arial", 14)).pack(pady=10)
 
@@ -257,7 +503,7 @@ class QuizApp:
 
             if category and difficulty and text and options and answer:
                 self.questions = backend.add_question(self.questions, category, difficulty, text, options, answer, feedback)
-                backend.save_questions('questions.toml', self.questions)
+                self.save_questions()
                 messagebox.showinfo("Success", "New question submitted successfully!")
                 self.setup_manage_questions_frame()
             else:
@@ -271,6 +517,7 @@ class QuizApp:
     def manage_questions(self):
         self.show_frame("manage_questions")
 
+    @metrics.instrument('gui.edit_question')
     def edit_question(self, index):
         frame = self.frames["manage_questions"]
         for widget in frame.winfo_children():
@@ -303,30 +550,35 @@ class QuizApp:
                 'answer': answer_entry.get(),
                 'feedback': feedback_entry.get()
             }
-            backend.save_questions('questions.toml', self.questions)
+            self.save_questions()
             messagebox.showinfo("Success", "Question updated successfully!")
             self.setup_manage_questions_frame()
 
         tk.Button(frame, text="Submit Changes", command=submit_edit, width=20, height=2).pack(pady=10)
         tk.Button(frame, text="Back to Manage Questions", command=self.setup_manage_questions_frame, width=20, height=2).pack(pady=10)
 
-    def show_leaderboard_frame(self):
+    @metrics.instrument('gui.setup_leaderboard_frame')
+    def setup_leaderboard_frame(self):
         frame = self.frames["leaderboard"]
         for widget in frame.winfo_children():
             widget.destroy()
 
         tk.Label(frame, text="Leaderboard", font=("Arial", 18, "bold")).pack(pady=20)
 
-        leaderboard = backend.get_leaderboard(self.users)
-        for user in leaderboard:
-            tk.Label(frame, text=f"User: {user['username']}, Score: {user['score']}", font=("Arial", 12)).pack()
+        leaderboard = backend.get_leaderboard(self.users, LEADERBOARD_SIZE)
+        for rank, user in enumerate(leaderboard, 1):
+            tk.Label(frame, text=f"{rank}. User: {user['username']}, Score: {user['score']}", font=("Arial", 12)).pack()
+
+        if self.current_user in self.users and self.current_user not in [user['username'] for user in leaderboard]:
+            rank = backend.get_user_rank(self.users, self.current_user)
+            tk.Label(frame, text=f"Your Rank: {rank} of {len(self.users)}", font=("Arial", 12)).pack(pady=10)
 
         tk.Button(frame, text="Back to Main Menu", command=lambda: self.show_frame("main_menu"), width=20, height=2).pack(pady=10)
 
     def show_leaderboard(self):
         self.show_frame("leaderboard")
-        self.show_leaderboard_frame()
 
+    @metrics.instrument('gui.setup_multiplayer_frame')
     def setup_multiplayer_frame(self):
         frame = self.frames["multiplayer"]
         for widget in frame.winfo_children():
@@ -347,8 +599,7 @@ class QuizApp:
             player2 = player2_entry.get()
 
             if player1 and player2:
-                self.users, game_id = backend.start_multiplayer_game(self.users, player1, player2)
-                backend.save_users('users.toml', self.users)
+                self.users, game_id = backend.start_multiplayer_game(self.users, player1, player2, self.games)
                 messagebox.showinfo("Game Started", f"Game started between {player1} and {player2} with ID: {game_id}")
                 self.show_frame("main_menu")
             else:
@@ -360,6 +611,29 @@ class QuizApp:
     def start_multiplayer(self):
         self.show_frame("multiplayer")
 
+    def save_questions(self):
+        # A SQLite bank has already queued its row writes. Otherwise a
+        # snapshot of the bank is decoded and written in the background; a
+        # burst of edits collapses into a single write.
+        if self.questions.journal is not None:
+            return
+        self.writer.submit(backend.save_questions, 'questions.toml', self.questions.snapshot(), key='questions')
+
+    def check_save_errors(self):
+        while self.writer.errors:
+            name, error = self.writer.errors.popleft()
+            messagebox.showerror("Save Failed", f"Could not save data ({name}): {error}")
+        self.root.after(500, self.check_save_errors)
+
+    def exit_app(self):
+        # Fold the user journal back into users.toml and wait for pending
+        # writes before leaving.
+        if self._users is not None:
+            self._users.compact()
+        self.writer.close()
+        metrics.report()
+        self.root.quit()
+
     def clear_frame(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -367,42 +641,54 @@ class QuizApp:
     def toggle_developer_mode(self):
         self.developer_mode = self.dev_mode_var.get()
         # Do not change dark_mode or dark_mode_var here to keep UI consistent
-        self.apply_theme()
 
     def toggle_dark_mode(self):
         self.dark_mode = self.dark_mode_var.get()
         self.apply_theme()
 
+    @metrics.instrument('gui.apply_theme')
     def apply_theme(self):
-        # Indie game-like style palette
-        if not self.dark_mode:
-            bg_color = "#1e1e2f"  # dark navy
-            fg_color = "#f0f0f0"  # off-white
-            button_bg = "#6c5ce7"  # vibrant purple
-            button_fg = "#f0f0f0"  # off-white
+        # The option database themes every widget created from now on, so
+        # existing widgets only need to be walked when the palette changes.
+        theme = THEMES[self.dark_mode]
+        if theme is self.theme:
+            return
+        self.theme = theme
+
+        self.root.configure(bg=theme['bg'])
+        self.root.option_add("*Background", theme['bg'])
+        self.root.option_add("*Foreground", theme['fg'])
+        self.root.option_add("*Font", THEME_FONT)
+        self.root.option_add("*Button.Background", theme['button_bg'])
+        self.root.option_add("*Button.Foreground", theme['button_fg'])
+        self.root.option_add("*Button.activeBackground", theme['button_fg'])
+        self.root.option_add("*Button.activeForeground", theme['button_bg'])
+        self.root.option_add("*Button.relief", tk.RAISED)
+        self.root.option_add("*Button.borderWidth", 3)
+
+        style = ttk.Style(self.root)
+        style.configure("Treeview", background=theme['bg'], foreground=theme['fg'], fieldbackground=theme['bg'], font=("Courier New", 12))
+        style.configure("Treeview.Heading", font=THEME_FONT)
+
+        if hasattr(self, 'main_frame'):
+            self.retheme_widgets(self.main_frame)
+
+    def retheme_widgets(self, widget):
+        theme = self.theme
+        if isinstance(widget, tk.Button):
+            options = {'bg': theme['button_bg'], 'fg': theme['button_fg'],
+                       'activebackground': theme['button_fg'], 'activeforeground': theme['button_bg']}
         else:
-            bg_color = "#121212"  # almost black
-            fg_color = "#dfe6e9"  # light gray
-            button_bg = "#00cec9"  # bright teal
-            button_fg = "#dfe6e9"  # light gray
-
-        self.root.configure(bg=bg_color)
-
-        # Apply theme to main frame and all subframes and their widgets
-        def apply_to_widgets(widget):
+            options = {'bg': theme['bg'], 'fg': theme['fg']}
+        try:
+            widget.configure(**options)
+        except tk.TclError:
             try:
-                widget.configure(bg=bg_color, fg=fg_color, font=("Courier New", 12, "bold"))
+                widget.configure(bg=theme['bg'])
             except tk.TclError:
                 pass
-            if isinstance(widget, tk.Button):
-                try:
-                    widget.configure(bg=button_bg, fg=button_fg, activebackground=button_fg, activeforeground=button_bg, relief=tk.RAISED, borderwidth=3, font=("Courier New", 12, "bold"))
-                except tk.TclError:
-                    pass
-            for child in widget.winfo_children():
-                apply_to_widgets(child)
-
-        apply_to_widgets(self.main_frame)
+        for child in widget.winfo_children():
+            self.retheme_widgets(child)
 
 if __name__ == "__main__":
     root = tk.Tk()
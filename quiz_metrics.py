@@ -0,0 +1,112 @@
+import functools
+import json
+import os
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets; the last
+# bucket catches everything slower.
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0)
+BUCKET_LABELS = ('<=1us', '<=10us', '<=100us', '<=1ms', '<=10ms', '<=100ms', '<=1s', '<=10s', '>10s')
+
+enabled = os.environ.get('QUIZ_METRICS', '') not in ('', '0')
+_stats = {}
+
+class OperationStats:
+    __slots__ = ('count', 'total', 'min', 'max', 'histogram', 'bytes_read', 'bytes_written')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.histogram[bisect_left(BUCKETS, seconds)] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total,
+            'mean_seconds': self.total / self.count if self.count else 0.0,
+            'min_seconds': self.min or 0.0,
+            'max_seconds': self.max,
+            'histogram': dict(zip(BUCKET_LABELS, self.histogram)),
+            'bytes_read': self.bytes_read,
+            'bytes_written': self.bytes_written
+        }
+
+def enable():
+    global enabled
+    enabled = True
+
+def disable():
+    global enabled
+    enabled = False
+
+def reset():
+    _stats.clear()
+
+def _get(name):
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = OperationStats()
+    return stats
+
+def record(name, seconds):
+    if enabled:
+        _get(name).add(seconds)
+
+def add_bytes(name, read=0, written=0):
+    if enabled:
+        stats = _get(name)
+        stats.bytes_read += read
+        stats.bytes_written += written
+
+def instrument(name):
+    # When metrics are off the wrapper costs one global lookup on top of
+    # the call itself.
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _get(name).add(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def snapshot():
+    return {name: stats.to_dict() for name, stats in sorted(_stats.items())}
+
+def summary():
+    lines = [f"{'operation':<32} {'calls':>8} {'mean':>10} {'max':>10} {'read':>12} {'written':>12}"]
+    for name, stats in sorted(_stats.items(), key=lambda item: item[1].total, reverse=True):
+        mean = stats.total / stats.count if stats.count else 0.0
+        lines.append(f"{name:<32} {stats.count:>8} {mean * 1e3:>8.3f}ms {stats.max * 1e3:>8.3f}ms "
+                     f"{stats.bytes_read:>12} {stats.bytes_written:>12}")
+    return '\n'.join(lines)
+
+def export_json(filename):
+    with open(filename, 'w') as file:
+        json.dump(snapshot(), file, indent=2)
+
+def report():
+    # Called on application exit: print the summary, and also write JSON
+    # when QUIZ_METRICS_JSON names a file.
+    if not enabled or not _stats:
+        return
+    print(summary())
+    filename = os.environ.get('QUIZ_METRICS_JSON')
+    if filename:
+        export_json(filename)
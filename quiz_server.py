@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import itertools
+import json
+import quiz_backend as backend
+from quiz_storage import BackgroundWriter
+
+class QuizSession:
+    __slots__ = ('session_id', 'username', 'questions', 'position', 'score')
+
+    def __init__(self, session_id, username, questions):
+        self.session_id = session_id
+        self.username = username
+        # Either the shared bank itself or a list of references into it, so
+        # sessions never copy question data.
+        self.questions = questions
+        self.position = 0
+        self.score = 0
+
+    @property
+    def finished(self):
+        return self.position >= len(self.questions)
+
+class QuizEngine:
+    # Headless equivalent of the quiz flow in QuizApp: any number of
+    # independent sessions over one read-only question bank.
+    def __init__(self, questions, users=None):
+        self.questions = questions
+        self.users = users if users is not None else backend.UserStore()
+        self._sessions = {}
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def start_session(self, username, category=None, difficulty=None, limit=None):
+        if not isinstance(username, str) or not username.strip():
+            raise ValueError("Username cannot be empty!")
+        for value in (category, difficulty):
+            if value is not None and not isinstance(value, str):
+                raise ValueError("Category and difficulty must be strings")
+        if username not in self.users:
+            self.users.add_user(username)
+        if category is None and difficulty is None:
+            questions = self.questions
+        else:
+            questions = backend.filter_questions(self.questions, category, difficulty)
+        if limit is not None:
+            questions = questions[:limit]
+        session = QuizSession(next(self._ids), username, questions)
+        self._sessions[session.session_id] = session
+        return session
+
+    def get_session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        return session
+
+    def current_question(self, session_id):
+        session = self.get_session(session_id)
+        if session.finished:
+            return None
+        question = session.questions[session.position]
+        return {
+            'index': session.position,
+            'total': len(session.questions),
+            'category': question['category'],
+            'difficulty': question['difficulty'],
+            'text': question['text'],
+            'options': list(question['options'])
+        }
+
+    def answer(self, session_id, choice):
+        session = self.get_session(session_id)
+        if session.finished:
+            raise ValueError("Quiz already finished")
+        question = session.questions[session.position]
+        if not 1 <= choice <= len(question['options']):
+            raise ValueError("Please select an option!")
+        correct = backend.ask_question(question, choice)
+        if correct:
+            session.score += 1
+        session.position += 1
+        return {
+            'correct': correct,
+            'answer': question['answer'],
+            'feedback': question['feedback'],
+            'score': session.score,
+            'finished': session.finished
+        }
+
+    def end_session(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            raise KeyError(f"Unknown session: {session_id}")
+        backend.update_user_best_score(self.users, session.username, session.score)
+        return {
+            'username': session.username,
+            'score': session.score,
+            'best_score': backend.get_user_best_score(self.users, session.username),
+            'rank': backend.get_user_rank(self.users, session.username)
+        }
+
+    def discard_session(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def leaderboard(self, limit=10):
+        return [{'username': user['username'], 'score': user['score']}
+                for user in backend.get_leaderboard(self.users, limit)]
+
+class QuizServer:
+    # Newline-delimited JSON over TCP. Each request is an object with an
+    # "op" field; each response has "ok" plus either the result or "error".
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def handle_client(self, reader, writer):
+        owned = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the stream limit; the rest of the
+                    # connection cannot be framed reliably, so say why and close.
+                    writer.write(json.dumps({'ok': False, 'error': "Request too long"}).encode('utf-8') + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                response = self.dispatch(line, owned)
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # Sessions left open by a dropped client are discarded unscored.
+            for session_id in owned:
+                self.engine.discard_session(session_id)
+            writer.close()
+
+    def dispatch(self, line, owned):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            op = request.get('op')
+            # A connection may only drive the sessions it started.
+            if op in ('question', 'answer', 'end') and request.get('session') not in owned:
+                raise KeyError(f"Unknown session: {request.get('session')}")
+            if op == 'start':
+                session = self.engine.start_session(request.get('username'), request.get('category'),
+                                                    request.get('difficulty'), request.get('limit'))
+                owned.add(session.session_id)
+                return {'ok': True, 'session': session.session_id,
+                        'question': self.engine.current_question(session.session_id)}
+            if op == 'question':
+                return {'ok': True, 'question': self.engine.current_question(request['session'])}
+            if op == 'answer':
+                result = self.engine.answer(request['session'], int(request['choice']))
+                result['question'] = self.engine.current_question(request['session'])
+                return {'ok': True, **result}
+            if op == 'end':
+                result = self.engine.end_session(request['session'])
+                owned.discard(request['session'])
+                return {'ok': True, **result}
+            if op == 'leaderboard':
+                return {'ok': True, 'leaderboard': self.engine.leaderboard(request.get('limit', 10))}
+            return {'ok': False, 'error': f"Unknown op: {op}"}
+        except (KeyError, ValueError, TypeError, OverflowError) as error:
+            return {'ok': False, 'error': str(error.args[0]) if error.args else type(error).__name__}
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless quiz server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--questions', default='questions.toml')
+    parser.add_argument('--users', default='users.toml')
+    args = parser.parse_args()
+
+    questions = backend.QuestionBank(backend.load_questions(args.questions, cached=True, compact=True))
+    # Journal writes (and their fsyncs) run on the writer thread, not the event loop.
+    writer = BackgroundWriter()
+    users = backend.open_users(args.users, writer=writer)
+    engine = QuizEngine(questions, users)
+    print(f"Serving {len(questions)} questions on {args.host}:{args.port}")
+    try:
+        asyncio.run(QuizServer(engine).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        users.compact()
+        writer.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import toml
+from collections import deque
+import quiz_metrics as metrics
+
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+JOURNAL_SUFFIX = '.journal'
+
+class StorageBackend:
+    def load_questions(self):
+        raise NotImplementedError
+
+    def save_questions(self, questions):
+        raise NotImplementedError
+
+    def load_users(self):
+        raise NotImplementedError
+
+    def save_users(self, users):
+        raise NotImplementedError
+
+    def iter_questions(self):
+        return iter(self.load_questions())
+
+    def append_questions(self, questions):
+        self.save_questions(self.load_questions() + list(questions))
+
+class TomlStorage(StorageBackend):
+    # Whole-file storage: every save rewrites the file. User mutations can
+    # be appended to a UserJournal next to the file in between saves.
+    def __init__(self, filename):
+        self.filename = filename
+        self.journal = filename + JOURNAL_SUFFIX
+
+    def load_questions(self):
+        with open(self.filename, 'r') as file:
+            data = toml.load(file)
+            metrics.add_bytes('load_questions', read=file.tell())
+        return data['question']
+
+    def save_questions(self, questions):
+        with open(self.filename, 'w') as file:
+            toml.dump({'question': [dict(question) for question in questions]}, file)
+            metrics.add_bytes('save_questions', written=file.tell())
+
+    def iter_questions(self):
+        # Parses one [[question]] table at a time instead of the whole file.
+        for block in self.iter_question_blocks():
+            yield from toml.loads(block).get('question', [])
+
+    def iter_question_blocks(self):
+        # Raw text of each [[question]] table, so callers can parse (and
+        # reject) them one at a time.
+        if not os.path.exists(self.filename):
+            return
+        block = []
+        with open(self.filename, 'r') as file:
+            for line in file:
+                if line.strip() == '[[question]]' and block:
+                    yield ''.join(block)
+                    block = []
+                block.append(line)
+        if block:
+            yield ''.join(block)
+
+    def append_questions(self, questions):
+        # New [[question]] tables are appended to a copy of the file that is
+        # then swapped in, so the import lands all at once or not at all.
+        temp_filename = self.filename + '.tmp'
+        if os.path.exists(self.filename):
+            shutil.copyfile(self.filename, temp_filename)
+        try:
+            with open(temp_filename, 'a') as file:
+                start = file.tell()
+                for question in questions:
+                    file.write('\n' + toml.dumps({'question': [dict(question)]}))
+                metrics.add_bytes('append_questions', written=file.tell() - start)
+                file.flush()
+                os.fsync(file.fileno())
+        except BaseException:
+            os.remove(temp_filename)
+            raise
+        os.replace(temp_filename, self.filename)
+
+    def load_users(self):
+        with open(self.filename, 'r') as file:
+            data = toml.load(file)
+            metrics.add_bytes('load_users', read=file.tell())
+        users = data['user']
+        if os.path.exists(self.journal):
+            users = replay_user_journal(self.journal, users)
+        return users
+
+    def save_users(self, users):
+        # Written to a temporary file and swapped in so a crash mid-write
+        # never truncates the snapshot. A fresh snapshot supersedes the journal.
+        temp_filename = self.filename + '.tmp'
+        with open(temp_filename, 'w') as file:
+            toml.dump({'user': list(users)}, file)
+            metrics.add_bytes('save_users', written=file.tell())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, self.filename)
+        if os.path.exists(self.journal):
+            os.remove(self.journal)
+
+@metrics.instrument('user_journal.replay')
+def replay_user_journal(journal, users):
+    users = {user['username']: user for user in users}
+    with open(journal, 'r') as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A torn final record from a crash mid-append is dropped.
+                break
+            if record['op'] == 'put':
+                users[record['user']['username']] = record['user']
+            elif record['op'] == 'delete':
+                users.pop(record['username'], None)
+    return list(users.values())
+
+class UserJournal:
+    def __init__(self, filename, compact_every=1000):
+        self.filename = filename
+        self.path = filename + JOURNAL_SUFFIX
+        self.compact_every = compact_every
+        self.pending = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb+') as file:
+                data = file.read()
+                complete = data.rfind(b'\n') + 1
+                if complete < len(data):
+                    # Cut off a torn record so new appends start on a clean line.
+                    file.truncate(complete)
+                self.pending = data.count(b'\n')
+
+    def record_put(self, user):
+        self._append({'op': 'put', 'user': user})
+
+    def record_delete(self, username):
+        self._append({'op': 'delete', 'username': username})
+
+    def needs_compaction(self):
+        return self.pending >= self.compact_every
+
+    def compact(self, users):
+        TomlStorage(self.filename).save_users(users)
+        self.pending = 0
+
+    @metrics.instrument('user_journal.append')
+    def _append(self, record):
+        line = json.dumps(record) + '\n'
+        with open(self.path, 'a') as file:
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+        metrics.add_bytes('user_journal.append', written=len(line))
+        self.pending += 1
+
+class BackgroundWriter:
+    # Runs persistence calls on one worker thread in submission order.
+    # Calls submitted with a key coalesce: until the queued call for that
+    # key runs, later submissions only replace its arguments. Failures are
+    # collected in `errors` for the UI thread to report.
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.errors = deque()
+        self._tasks = deque()
+        self._keyed = {}
+        self._busy = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="quiz-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, key=None):
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("BackgroundWriter is closed")
+            if key is None:
+                self._tasks.append((None, func, args))
+            else:
+                if key not in self._keyed:
+                    self._tasks.append((key, None, None))
+                self._keyed[key] = (func, args)
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._tasks and not self._busy, timeout)
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._tasks or self._closed)
+                if not self._tasks:
+                    return
+                key = self._tasks[0][0]
+            if key is not None and self.delay and not self._closed:
+                # Give a burst of saves a moment to coalesce into one write.
+                time.sleep(self.delay)
+            with self._condition:
+                key, func, args = self._tasks.popleft()
+                if key is not None:
+                    func, args = self._keyed.pop(key)
+                self._busy = True
+            try:
+                func(*args)
+            except Exception as error:
+                self.errors.append((key or getattr(func, '__name__', 'write'), error))
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+class QueuedJournal:
+    # Hands a UserStore's journal writes to a BackgroundWriter. Records
+    # carry a copy of the user, and compaction snapshots the user list, so
+    # the UI thread can keep mutating while the writer catches up.
+    def __init__(self, journal, writer):
+        self.journal = journal
+        self.writer = writer
+        # The journal's pending count only drops once the writer runs the
+        # compaction, so this stops every mutation until then from queueing
+        # (and snapshotting the users for) another one.
+        self.compaction_queued = False
+
+    def record_put(self, user):
+        self.writer.submit(self.journal.record_put, dict(user))
+
+    def record_delete(self, username):
+        self.writer.submit(self.journal.record_delete, username)
+
+    def record_question_insert(self, question_id, question):
+        self.writer.submit(self.journal.record_question_insert, question_id, dict(question))
+
+    def record_question_update(self, question_id, question):
+        self.writer.submit(self.journal.record_question_update, question_id, dict(question))
+
+    def record_question_delete(self, question_id):
+        self.writer.submit(self.journal.record_question_delete, question_id)
+
+    def needs_compaction(self):
+        return not self.compaction_queued and self.journal.needs_compaction()
+
+    def compact(self, users):
+        self.compaction_queued = True
+        self.writer.submit(self._compact, list(users), key=f"compact:{self.journal.filename}")
+
+    def _compact(self, users):
+        try:
+            self.journal.compact(users)
+        finally:
+            self.compaction_queued = False
+
+class SqliteStorage(StorageBackend):
+    # Questions and users live in indexed tables. Saves run as one batched
+    # transaction, and users can be written row by row through the same
+    # record_put/record_delete interface UserStore uses for its journal.
+    # Questions are written row by row through a SqliteQuestionJournal.
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename, timeout=30, check_same_thread=False)
+        # WAL lets several processes read while one writes.
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        with self.connection:
+            self.connection.executescript('''
+                CREATE TABLE IF NOT EXISTS questions (
+                    id INTEGER PRIMARY KEY,
+                    category TEXT NOT NULL,
+                    difficulty TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    feedback TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS questions_category_difficulty
+                    ON questions (lower(trim(category)), lower(trim(difficulty)));
+                CREATE INDEX IF NOT EXISTS questions_difficulty
+                    ON questions (lower(trim(difficulty)));
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    score INTEGER NOT NULL DEFAULT 0,
+                    current_game TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS users_score ON users (score DESC);
+            ''')
+
+    def load_questions(self):
+        rows = self.connection.execute(
+            'SELECT category, difficulty, text, options, answer, feedback FROM questions ORDER BY id')
+        return [self._question(row) for row in rows]
+
+    def save_questions(self, questions):
+        with self.connection:
+            self.connection.execute('DELETE FROM questions')
+            self.connection.executemany(
+                'INSERT INTO questions (category, difficulty, text, options, answer, feedback) VALUES (?, ?, ?, ?, ?, ?)',
+                (self._question_row(question) for question in questions))
+
+    def iter_questions(self):
+        rows = self.connection.execute(
+            'SELECT category, difficulty, text, options, answer, feedback FROM questions ORDER BY id')
+        for row in rows:
+            yield self._question(row)
+
+    def append_questions(self, questions):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO questions (category, difficulty, text, options, answer, feedback) VALUES (?, ?, ?, ?, ?, ?)',
+                (self._question_row(question) for question in questions))
+
+    def load_question_rows(self):
+        rows = self.connection.execute(
+            'SELECT id, category, difficulty, text, options, answer, feedback FROM questions ORDER BY id')
+        return [(row[0], self._question(row[1:])) for row in rows]
+
+    def insert_question(self, question):
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT INTO questions (category, difficulty, text, options, answer, feedback) VALUES (?, ?, ?, ?, ?, ?)',
+                self._question_row(question))
+        return cursor.lastrowid
+
+    def update_question(self, row_id, question):
+        with self.connection:
+            self.connection.execute(
+                'UPDATE questions SET category = ?, difficulty = ?, text = ?, options = ?, answer = ?, feedback = ? '
+                'WHERE id = ?', self._question_row(question) + (row_id,))
+
+    def delete_question(self, row_id):
+        with self.connection:
+            self.connection.execute('DELETE FROM questions WHERE id = ?', (row_id,))
+
+    def filter_questions(self, category=None, difficulty=None):
+        query = 'SELECT category, difficulty, text, options, answer, feedback FROM questions'
+        clauses = []
+        params = []
+        if category is not None:
+            clauses.append('lower(trim(category)) = lower(trim(?))')
+            params.append(category)
+        if difficulty is not None:
+            clauses.append('lower(trim(difficulty)) = lower(trim(?))')
+            params.append(difficulty)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        rows = self.connection.execute(query + ' ORDER BY id', params)
+        return [self._question(row) for row in rows]
+
+    def load_users(self):
+        rows = self.connection.execute('SELECT username, score, current_game FROM users ORDER BY rowid')
+        return [self._user(row) for row in rows]
+
+    def save_users(self, users):
+        with self.connection:
+            self.connection.execute('DELETE FROM users')
+            self.connection.executemany(
+                'INSERT INTO users (username, score, current_game) VALUES (?, ?, ?)',
+                (self._user_row(user) for user in users))
+
+    def find_user(self, username):
+        row = self.connection.execute(
+            'SELECT username, score, current_game FROM users WHERE username = ?', (username,)).fetchone()
+        return self._user(row) if row else None
+
+    def record_put(self, user):
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO users (username, score, current_game) VALUES (?, ?, ?)',
+                self._user_row(user))
+
+    def record_delete(self, username):
+        with self.connection:
+            self.connection.execute('DELETE FROM users WHERE username = ?', (username,))
+
+    def needs_compaction(self):
+        return False
+
+    def compact(self, users):
+        pass
+
+    def close(self):
+        self.connection.close()
+
+    def _question(self, row):
+        category, difficulty, text, options, answer, feedback = row
+        return {
+            'category': category,
+            'difficulty': difficulty,
+            'text': text,
+            'options': json.loads(options),
+            'answer': answer,
+            'feedback': feedback
+        }
+
+    def _question_row(self, question):
+        return (question['category'], question['difficulty'], question['text'],
+                json.dumps(list(question['options'])), question['answer'], question.get('feedback', ''))
+
+    def _user(self, row):
+        username, score, current_game = row
+        return {'username': username, 'score': score, 'current_game': current_game}
+
+    def _user_row(self, user):
+        return user['username'], user['score'], user.get('current_game', '')
+
+class SqliteQuestionJournal:
+    # Row-level writes for one QuestionBank. Bank ids are mapped to the
+    # SQLite row ids the questions were loaded or inserted with, so edits
+    # and deletes hit the right row even after other processes have
+    # changed the table.
+    def __init__(self, storage, row_ids):
+        self.storage = storage
+        self.row_ids = row_ids
+
+    def record_question_insert(self, question_id, question):
+        self.row_ids[question_id] = self.storage.insert_question(question)
+
+    def record_question_update(self, question_id, question):
+        row_id = self.row_ids.get(question_id)
+        if row_id is not None:
+            self.storage.update_question(row_id, question)
+
+    def record_question_delete(self, question_id):
+        row_id = self.row_ids.pop(question_id, None)
+        if row_id is not None:
+            self.storage.delete_question(row_id)
+
+_sqlite_storages = {}
+
+def is_sqlite(filename):
+    return filename.lower().endswith(SQLITE_EXTENSIONS)
+
+def get_storage(filename):
+    if is_sqlite(filename):
+        # One connection per database file, shared by the question and user
+        # helpers that point at it.
+        path = os.path.abspath(filename)
+        storage = _sqlite_storages.get(path)
+        if storage is None:
+            storage = _sqlite_storages[path] = SqliteStorage(filename)
+        return storage
+    return TomlStorage(filename)
+
+def migrate_to_sqlite(questions_filename, users_filename, database_filename):
+    questions = TomlStorage(questions_filename).load_questions()
+    users = TomlStorage(users_filename).load_users()
+    storage = get_storage(database_filename)
+    storage.save_questions(questions)
+    storage.save_users(users)
+    return len(questions), len(users)
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 4:
+        sys.exit("usage: python quiz_storage.py QUESTIONS_TOML USERS_TOML DATABASE")
+    question_count, user_count = migrate_to_sqlite(*sys.argv[1:])
+    print(f"Migrated {question_count} questions and {user_count} users to {sys.argv[3]}")
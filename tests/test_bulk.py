@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+import toml
+import pytest
+import quiz_backend as backend
+import quiz_bulk as bulk
+
+def question(text, answer='Yes'):
+    return {'category': 'Science', 'difficulty': 'Easy', 'text': text,
+            'options': ['Yes', 'No'], 'answer': answer, 'feedback': ''}
+
+def write_jsonl(path, lines):
+    with open(path, 'w') as file:
+        file.write('\n'.join(lines) + '\n')
+
+def write_toml(path, blocks):
+    with open(path, 'w') as file:
+        file.write('\n'.join(blocks))
+
+def toml_block(record):
+    return toml.dumps({'question': [record]})
+
+def texts(filename):
+    return [question['text'] for question in backend.load_questions(filename)]
+
+def test_validate_question_normalizes_and_rejects():
+    validated = bulk.validate_question({'category': '  General   Science ', 'difficulty': ' HARD ', 'text': ' Q ',
+                                        'options': ['Yes', 'No'], 'answer': 'No'})
+    assert validated == {'category': 'General Science', 'difficulty': 'hard', 'text': 'Q',
+                         'options': ['Yes', 'No'], 'answer': 'No', 'feedback': ''}
+    for record in ([1, 2], {}, dict(question('Q'), text=' '), dict(question('Q'), options=[]),
+                   question('Q', answer='Maybe')):
+        with pytest.raises(ValueError):
+            bulk.validate_question(record)
+
+def test_duplicates_are_skipped_against_bank_and_batch(tmp_path):
+    bank = str(tmp_path / 'bank.toml')
+    backend.save_questions(bank, [question('Existing')])
+    source = str(tmp_path / 'new.jsonl')
+    write_jsonl(source, [json.dumps(question('existing ')), json.dumps(question('New')),
+                         json.dumps(dict(question('New'), feedback='reworded'))])
+
+    report = bulk.import_questions(source, bank)
+    assert (report.imported, report.duplicates, report.invalid) == (1, 2, 0)
+    assert texts(bank) == ['Existing', 'New']
+
+def test_malformed_jsonl_records_are_rejected(tmp_path):
+    bank = str(tmp_path / 'bank.toml')
+    source = str(tmp_path / 'new.jsonl')
+    write_jsonl(source, [json.dumps(question('One')), '{not json', '[1, 2]', json.dumps(question('Two'))])
+
+    report = bulk.import_questions(source, bank)
+    assert (report.imported, report.invalid) == (2, 2)
+    assert [number for number, _ in report.errors] == [2, 3]
+    assert texts(bank) == ['One', 'Two']
+    assert not os.path.exists(bank + '.tmp')
+
+def test_malformed_csv_records_are_rejected(tmp_path):
+    bank = str(tmp_path / 'bank.toml')
+    source = str(tmp_path / 'new.csv')
+    with open(source, 'w', newline='') as file:
+        file.write('category,difficulty,text,options,answer,feedback\n'
+                   'Science,easy,One,Yes|No,Yes,\n'
+                   'Science,easy,Bad options,"[not json",Yes,\n'
+                   'Science,easy,' + 'x' * 500 + ',Yes|No,Yes,\n'
+                   'Science,easy,Two,"[""Yes"", ""No""]",No,\n')
+    limit = csv.field_size_limit(100)
+    try:
+        report = bulk.import_questions(source, bank)
+    finally:
+        csv.field_size_limit(limit)
+    assert (report.imported, report.invalid) == (2, 2)
+    assert texts(bank) == ['One', 'Two']
+
+def test_malformed_toml_records_are_rejected(tmp_path):
+    bank = str(tmp_path / 'bank.toml')
+    source = str(tmp_path / 'new.toml')
+    write_toml(source, [toml_block(question('One')), '[[question]]\ntext = "unterminated\n',
+                        toml_block(question('Two'))])
+
+    report = bulk.import_questions(source, bank)
+    assert (report.imported, report.invalid) == (2, 1)
+    assert texts(bank) == ['One', 'Two']
+
+def test_export_round_trips_every_format(tmp_path):
+    questions = [question('One'), question('Two', answer='No')]
+    for format in bulk.FORMATS:
+        filename = str(tmp_path / f'export.{format}')
+        bulk.export_questions(questions, filename)
+        assert [bulk.validate_question(record) for record in bulk.read_questions(filename)] == \
+               [bulk.validate_question(record) for record in questions]
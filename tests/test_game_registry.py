@@ -0,0 +1,38 @@
+import quiz_backend as backend
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_idle_game_is_not_returned_or_revived():
+    clock = FakeClock()
+    registry = backend.GameRegistry(idle_timeout=10, clock=clock)
+    game = registry.create('a', 'b')
+    clock.now = 1000
+
+    assert registry.game_for('a') is None
+    assert registry.get(game.game_id) is None
+    assert registry.record_score(game.game_id, 'a') is None
+    assert game.game_id not in registry
+    assert len(registry) == 0
+
+def test_activity_keeps_a_game_alive():
+    clock = FakeClock()
+    registry = backend.GameRegistry(idle_timeout=10, clock=clock)
+    game = registry.create('a', 'b')
+    for step in range(1, 5):
+        clock.now = step * 8
+        assert registry.record_score(game.game_id, 'a') is game
+    assert registry.game_for('b') is game
+    assert game.scores['a'] == 4
+
+def test_new_game_replaces_players_previous_game():
+    registry = backend.GameRegistry()
+    first = registry.create('a', 'b')
+    second = registry.create('a', 'c')
+    assert registry.game_for('a') is second
+    assert registry.game_for('b') is first
+    assert first.game_id != second.game_id
@@ -0,0 +1,54 @@
+import random
+import quiz_backend as backend
+
+def reference(scores):
+    return sorted((-score, username) for username, score in scores.items())
+
+def check(leaderboard, scores, rng):
+    entries = reference(scores)
+    assert len(leaderboard) == len(scores)
+    assert leaderboard.top() == [(username, -score) for score, username in entries]
+    for start in (0, 3, len(entries) // 2, max(len(entries) - 2, 0)):
+        assert leaderboard.page(start, 7) == [(username, -score) for score, username in entries[start:start + 7]]
+    for username in rng.sample(sorted(scores), min(10, len(scores))):
+        score = scores[username]
+        # Players on the same score share the rank of the first of them.
+        assert leaderboard.rank(username) == sum(1 for other in scores.values() if other > score) + 1
+        position = entries.index((-score, username))
+        assert leaderboard.around(username, 2) == [(name, -value) for value, name in entries[max(position - 2, 0):position + 3]]
+
+def test_matches_sorted_reference_under_random_updates(monkeypatch):
+    # A tiny block size forces frequent splits and emptied blocks.
+    monkeypatch.setattr(backend, 'LEADERBOARD_BLOCK', 4)
+    rng = random.Random(7)
+    initial = {f"user{i}": rng.randrange(20) for i in range(50)}
+    leaderboard = backend.Leaderboard(initial.items())
+    scores = dict(initial)
+    check(leaderboard, scores, rng)
+    for step in range(3000):
+        username = f"user{rng.randrange(120)}"
+        if rng.random() < 0.25:
+            leaderboard.remove(username)
+            scores.pop(username, None)
+        else:
+            score = rng.randrange(20)
+            leaderboard.update(username, score)
+            scores[username] = score
+        if step % 50 == 0:
+            check(leaderboard, scores, rng)
+    check(leaderboard, scores, rng)
+
+def test_empty_and_unknown_users():
+    leaderboard = backend.Leaderboard()
+    assert leaderboard.top(5) == []
+    assert leaderboard.page(10, 5) == []
+    assert leaderboard.rank('nobody') is None
+    assert leaderboard.around('nobody') == []
+    leaderboard.update('a', 1)
+    leaderboard.remove('a')
+    leaderboard.remove('a')
+    assert len(leaderboard) == 0 and leaderboard.top() == []
+
+def test_ties_share_a_rank():
+    leaderboard = backend.Leaderboard([('a', 5), ('b', 7), ('c', 5), ('d', 1)])
+    assert [leaderboard.rank(name) for name in 'abcd'] == [2, 1, 2, 4]
@@ -0,0 +1,63 @@
+import os
+import quiz_backend as backend
+
+def question(text):
+    return {'category': 'Science', 'difficulty': 'easy', 'text': text,
+            'options': ['Yes', 'No'], 'answer': 'Yes', 'feedback': ''}
+
+def texts(questions):
+    return [question['text'] for question in questions]
+
+def test_cache_is_built_then_reused(tmp_path):
+    path = str(tmp_path / 'questions.toml')
+    backend.save_questions(path, [question('One'), question('Two')])
+
+    first = backend.load_questions(path, cached=True)
+    assert isinstance(first, list)
+    assert os.path.exists(path + backend.CACHE_SUFFIX)
+
+    second = backend.load_questions(path, cached=True)
+    assert isinstance(second, backend.LazyQuestions)
+    assert texts(second) == ['One', 'Two']
+    assert second.category_difficulty(1) == ('science', 'easy')
+    second.close()
+
+def test_cache_is_rebuilt_when_file_changes(tmp_path):
+    path = str(tmp_path / 'questions.toml')
+    backend.save_questions(path, [question('One'), question('Two')])
+    backend.load_questions(path, cached=True)
+
+    # Same size and an mtime set back to the cached one would hide the edit,
+    # so move the mtime forward explicitly.
+    stat = os.stat(path)
+    backend.save_questions(path, [question('Uno'), question('Two')])
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    questions = backend.load_questions(path, cached=True)
+    assert texts(questions) == ['Uno', 'Two']
+    cached = backend.load_questions(path, cached=True)
+    assert texts(cached) == ['Uno', 'Two']
+    cached.close()
+
+def test_touched_but_unchanged_file_keeps_cache(tmp_path):
+    path = str(tmp_path / 'questions.toml')
+    backend.save_questions(path, [question('One')])
+    backend.load_questions(path, cached=True)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    questions = backend.load_questions(path, cached=True)
+    assert isinstance(questions, backend.LazyQuestions)
+    assert texts(questions) == ['One']
+    questions.close()
+
+def test_corrupt_cache_is_rebuilt(tmp_path):
+    path = str(tmp_path / 'questions.toml')
+    backend.save_questions(path, [question('One')])
+    with open(path + backend.CACHE_SUFFIX, 'wb') as file:
+        file.write(b'garbage')
+
+    assert texts(backend.load_questions(path, cached=True)) == ['One']
+    questions = backend.load_questions(path, cached=True)
+    assert isinstance(questions, backend.LazyQuestions)
+    questions.close()
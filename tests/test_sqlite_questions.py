@@ -0,0 +1,42 @@
+import quiz_backend as backend
+from quiz_storage import BackgroundWriter
+
+def question(text):
+    return {'category': 'Literature', 'difficulty': 'easy', 'text': text,
+            'options': ['Yes', 'No'], 'answer': 'Yes', 'feedback': ''}
+
+def texts(filename):
+    return [question['text'] for question in backend.load_questions(filename)]
+
+def test_row_writes_follow_the_loaded_rows(tmp_path):
+    filename = str(tmp_path / 'quiz.db')
+    backend.save_questions(filename, [question(text) for text in ('a', 'b', 'c', 'd')])
+    bank = backend.open_questions(filename)
+    bank.delete_question(1)
+    bank[-1] = question('d2')
+    bank.add_question('Science', 'hard', 'e', ['Yes', 'No'], 'No', '')
+    bank[3] = question('e2')
+    assert texts(filename) == ['a', 'c', 'd2', 'e2']
+
+def test_two_banks_sharing_a_database(tmp_path):
+    # Each bank edits the rows it loaded, not whatever sits at the same
+    # position after the other bank's changes.
+    filename = str(tmp_path / 'quiz.db')
+    backend.save_questions(filename, [question(text) for text in ('a', 'b', 'c', 'd')])
+    first = backend.open_questions(filename)
+    second = backend.open_questions(filename)
+    first.delete_question(0)
+    second[2] = question('c2')
+    second.delete_question(3)
+    assert texts(filename) == ['b', 'c2']
+
+def test_queued_row_writes(tmp_path):
+    filename = str(tmp_path / 'quiz.db')
+    backend.save_questions(filename, [question('a')])
+    writer = BackgroundWriter(delay=0)
+    bank = backend.open_questions(filename, compact=True, writer=writer)
+    bank.add_question('Science', 'hard', 'b', ['Yes', 'No'], 'No', '')
+    bank[1] = question('b2')
+    bank.delete_question(0)
+    writer.close()
+    assert texts(filename) == ['b2']
@@ -0,0 +1,55 @@
+import os
+import toml
+import quiz_backend as backend
+from quiz_storage import JOURNAL_SUFFIX, UserJournal
+
+def write_users(path, users):
+    with open(path, 'w') as file:
+        toml.dump({'user': users}, file)
+
+def scores(users):
+    return {user['username']: user['score'] for user in users}
+
+def test_replay_applies_puts_and_deletes(tmp_path):
+    path = str(tmp_path / 'users.toml')
+    write_users(path, [{'username': 'alice', 'score': 1, 'current_game': ''},
+                       {'username': 'bob', 'score': 2, 'current_game': ''}])
+    store = backend.open_users(path)
+    store.update_best_score('alice', 7)
+    store.add_user('carol')
+    store.delete('bob')
+
+    # No compaction ran, so the snapshot is stale and the journal carries the changes.
+    assert scores(toml.load(path)['user']) == {'alice': 1, 'bob': 2}
+    assert scores(backend.load_users(path)) == {'alice': 7, 'carol': 0}
+
+def test_torn_record_is_dropped_and_truncated(tmp_path):
+    path = str(tmp_path / 'users.toml')
+    write_users(path, [{'username': 'alice', 'score': 1, 'current_game': ''}])
+    store = backend.open_users(path)
+    store.update_best_score('alice', 5)
+    # Simulate a crash part way through appending the next record.
+    with open(path + JOURNAL_SUFFIX, 'a') as file:
+        file.write('{"op": "put", "user": {"username": "al')
+
+    assert scores(backend.load_users(path)) == {'alice': 5}
+
+    # Reopening cuts the torn tail, so later records replay cleanly.
+    store = backend.open_users(path)
+    store.update_best_score('alice', 9)
+    with open(path + JOURNAL_SUFFIX) as file:
+        assert len(file.readlines()) == 2
+    assert scores(backend.load_users(path)) == {'alice': 9}
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    path = str(tmp_path / 'users.toml')
+    write_users(path, [])
+    store = backend.open_users(path, compact_every=3)
+    for name in ('a', 'b'):
+        store.add_user(name)
+    assert os.path.exists(path + JOURNAL_SUFFIX)
+    store.add_user('c')
+
+    assert not os.path.exists(path + JOURNAL_SUFFIX)
+    assert scores(toml.load(path)['user']) == {'a': 0, 'b': 0, 'c': 0}
+    assert UserJournal(path).pending == 0